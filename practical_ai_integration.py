@@ -3,8 +3,6 @@
 Practical AI Provider Integration Demo
 Shows real-world usage of configurable AI providers for C++ to Kotlin conversion
 """
-import json
-import os
 
 def create_provider_examples():
     """Create example configurations for different scenarios"""
@@ -147,6 +145,7 @@ def show_command_examples():
 
 def show_configuration_recipes():
     """Show configuration recipes for different needs"""
+    import json  # only the recipes need it; keeps the demo's startup import-free
     
     print("\n\n📋 CONFIGURATION RECIPES")
     print("=" * 60)
@@ -21,58 +21,40 @@ import argparse
 import json
 from collections import Counter
 from pathlib import Path
-from typing import Any, Dict, Iterable, Tuple
+from typing import Any, Dict, Tuple
+
+from lst_tokens import simdjson, token_stream
 
 
 def load_json(path: Path) -> Any:
+    # Optional accelerators are imported where they are used so plain runs
+    # don't pay their import time.
+    try:
+        import orjson  # several times faster than json on large LSTs
+    except ImportError:
+        pass
+    else:
+        return orjson.loads(path.read_bytes())
     with path.open("r", encoding="utf-8") as f:
         return json.load(f)
 
 
-def token_stream(obj: Any, parent_key: str | None = None) -> Iterable[str]:
-    # Schema-light tokenization from an arbitrary LST-like JSON
-    if isinstance(obj, dict):
-        for k, v in obj.items():
-            # Key presence token
-            yield f"K:{k}"
-            # Common type/kind tags
-            if k in ("kind", "type", "node", "tag") and isinstance(v, str):
-                yield f"T:{v}"
-            # Common identifier names
-            if k in ("name", "identifier", "callee", "declName") and isinstance(v, str):
-                if v:
-                    yield f"ID:{v}"
-            # Recurse
-            yield from token_stream(v, k)
-    elif isinstance(obj, list):
-        # Length bucket to prevent overfitting exact sizes
-        try:
-            n = len(obj)
-        except Exception:
-            n = 0
-        # Bucketize lengths to reduce noise while keeping structure signal
-        if n == 0:
-            yield "LEN:0"
-        elif n <= 3:
-            yield f"LEN:{n}"
-        elif n <= 8:
-            yield "LEN:4-8"
-        else:
-            yield "LEN:9+"
-        for it in obj:
-            yield from token_stream(it, parent_key)
-    else:
-        # Literals
-        if isinstance(obj, bool):
-            yield f"LIT:bool:{obj}"
-        elif isinstance(obj, int):
-            yield "LIT:int"
-        elif isinstance(obj, float):
-            yield "LIT:float"
-        elif isinstance(obj, str):
-            # Avoid including long strings; just mark presence
-            if parent_key in ("string", "value", "literal", "text"):
-                yield "LIT:string"
+def load_lst(path: Path, parser: Any = None) -> Any:
+    # simdjson parses into its own buffer; values are only converted to Python
+    # objects as token_stream walks into them. A parser may be reused once
+    # the previous document is no longer referenced.
+    if simdjson is not None:
+        return (parser or simdjson.Parser()).parse(path.read_bytes())
+    return load_json(path)
+
+
+def build_counter(path: Path, parser: Any = None) -> Counter:
+    # Count in fixed-size batches so only one LST and one Counter are alive
+    # at a time; the parsed document is released when this returns.
+    counts: Counter = Counter()
+    for batch in token_stream(load_lst(path, parser)):
+        counts.update(batch)
+    return counts
 
 
 def apply_mapping(tokens: Counter, mapping: Dict[str, Any]) -> Counter:
@@ -118,15 +100,12 @@ def main() -> None:
     kt_lst = Path(args.kotlin_lst)
     mapping = Path(args.mapping) if args.mapping else None
 
-    cpp = load_json(cpp_lst)
-    kt = load_json(kt_lst)
     mapping_obj = load_json(mapping) if mapping and mapping.exists() else {}
 
-    toks_a = Counter(token_stream(cpp))
-    toks_b = Counter(token_stream(kt))
-
-    toks_a = apply_mapping(toks_a, mapping_obj)
-    toks_b = apply_mapping(toks_b, mapping_obj)
+    # One LST at a time: the C++ tree is dropped before the Kotlin one is parsed.
+    parser = simdjson.Parser() if simdjson is not None else None
+    toks_a = apply_mapping(build_counter(cpp_lst, parser), mapping_obj)
+    toks_b = apply_mapping(build_counter(kt_lst, parser), mapping_obj)
 
     only_a, only_b = diff_counters(toks_a, toks_b)
 
@@ -0,0 +1,103 @@
+"""
+Schema-light LST tokenizer used by lst_accuracy.py.
+
+Kept in its own module, with no dependencies beyond the optional simdjson,
+so it can be compiled ahead of time:
+
+    mypyc tools/accuracy/lst_tokens.py
+
+The resulting extension (lst_tokens.*.so) is picked up by the import system in
+preference to this file; without it the pure-Python version is used unchanged.
+"""
+import sys
+from typing import Any, Dict, Iterator, List
+
+try:
+    import simdjson  # type: ignore  # optional: lazy On-Demand proxies for LST traversal
+except ImportError:
+    simdjson = None  # type: ignore
+    MAP_TYPES: Any = (dict,)
+    SEQ_TYPES: Any = (list,)
+else:
+    MAP_TYPES = (dict, simdjson.Object)
+    SEQ_TYPES = (list, simdjson.Array)
+
+# Keys whose string values become tokens; other values are only classified by type.
+TYPE_KEYS = frozenset(("kind", "type", "node", "tag"))
+NAME_KEYS = frozenset(("name", "identifier", "callee", "declName"))
+STRING_KEYS = frozenset(("string", "value", "literal", "text"))
+
+# Token flyweights: every occurrence of a token is the same interned str, so
+# Counter hashing hits the cached hash and memory scales with unique tokens.
+K_TOK: Dict[str, str] = {k: sys.intern(f"K:{k}") for k in TYPE_KEYS | NAME_KEYS | STRING_KEYS}
+T_TOK: Dict[str, str] = {}
+LIT_BOOL = {True: sys.intern("LIT:bool:True"), False: sys.intern("LIT:bool:False")}
+LIT_INT = sys.intern("LIT:int")
+LIT_FLOAT = sys.intern("LIT:float")
+LIT_STRING = sys.intern("LIT:string")
+# Length buckets indexed by min(len, 9): keeps structure signal without
+# overfitting exact sizes.
+LEN_TOK = tuple(sys.intern(t) for t in ("LEN:0", "LEN:1", "LEN:2", "LEN:3") + ("LEN:4-8",) * 5 + ("LEN:9+",))
+
+
+def token_stream(obj: Any, parent_key: str | None = None, batch_size: int = 65536) -> Iterator[List[str]]:
+    # Schema-light tokenization from an arbitrary LST-like JSON, yielded in
+    # lists of about batch_size tokens.
+    # Walks an explicit stack instead of recursing so deep LSTs cost neither
+    # a generator frame per node nor the interpreter recursion limit.
+    out: List[str] = []
+    emit = out.append
+    id_tok: Dict[str, str] = {}
+    stack = [(obj, parent_key)]
+    pop = stack.pop
+    push = stack.append
+    while stack:
+        if len(out) >= batch_size:
+            yield out
+            out = []
+            emit = out.append
+        obj, parent_key = pop()
+        if isinstance(obj, MAP_TYPES):
+            for k, v in obj.items():
+                # Key presence token
+                tok = K_TOK.get(k)
+                if tok is None:
+                    tok = K_TOK[k] = sys.intern(f"K:{k}")
+                emit(tok)
+                # Common type/kind tags
+                if k in TYPE_KEYS and isinstance(v, str):
+                    tok = T_TOK.get(v)
+                    if tok is None:
+                        tok = T_TOK[v] = sys.intern(f"T:{v}")
+                    emit(tok)
+                # Common identifier names
+                if k in NAME_KEYS and isinstance(v, str):
+                    if v:
+                        tok = id_tok.get(v)
+                        if tok is None:
+                            tok = id_tok[v] = sys.intern(f"ID:{v}")
+                        emit(tok)
+                # Descend
+                push((v, k))
+        elif isinstance(obj, SEQ_TYPES):
+            # Length bucket to prevent overfitting exact sizes
+            try:
+                n = len(obj)
+            except Exception:
+                n = 0
+            emit(LEN_TOK[n] if n < 9 else LEN_TOK[9])
+            for it in obj:
+                push((it, parent_key))
+        else:
+            # Literals
+            if isinstance(obj, bool):
+                emit(LIT_BOOL[obj])
+            elif isinstance(obj, int):
+                emit(LIT_INT)
+            elif isinstance(obj, float):
+                emit(LIT_FLOAT)
+            elif isinstance(obj, str):
+                # Avoid including long strings; just mark presence
+                if parent_key in STRING_KEYS:
+                    emit(LIT_STRING)
+    yield out
@@ -3,13 +3,50 @@
 AI Chunk Assembler
 Assembles AI-converted and validated chunks into final Kotlin file
 """
+import functools
+import io
 import os
+import re
 import json
 import argparse
-from typing import Dict, List, Optional
-from dataclasses import dataclass
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterator, List, Optional, Tuple
+from dataclasses import dataclass, field
+from chunk_common import dump_json, read_text, write_bytes
 
-@dataclass
+_HEADER_TEMPLATE = """
+///////////////////////////////////////////////////////////////////////////////
+//
+// file name  : Test.cpp -> {name}.kt (AI Converted)
+// class name : {name}
+// Copyright My Company Limited
+// Generated by AI-powered conversion workflow
+//
+//////////////////////////////////////////////////////////////////////////////
+"""
+
+# Content markers for _infer_chunk_type (plain substrings, as before)
+_ID_TYPES = ('class', 'constructor', 'property')  # checked in priority order
+_MARKERS = (('function', 'fun '), ('class', 'class '), ('constructor', 'init'))
+_TYPE_RE = re.compile(r'(?P<function>fun )|(?P<class>class )|(?P<constructor>init)|(?P<property>va[lr] )')
+
+# Post-processing: a function body runs from a `fun`/`private fun` line up to the
+# next line that is just '}'; inside it, every blank line after the first in a run is dropped
+_FUNC_BODY_RE = re.compile(r'^[^\S\n]*(?:private )?fun [^\n]*?\S.*?(?=\n[^\S\n]*\}[^\S\n]*$|\Z)', re.MULTILINE | re.DOTALL)
+_BLANK_RUN_RE = re.compile(r'^([^\S\n]*)(?:\n[^\S\n]*(?=\n|\Z))+', re.MULTILINE)
+
+# Start of every line that has non-whitespace content
+_CONTENT_LINE_RE = re.compile(r'^(?=[^\S\n]*\S)', re.MULTILINE)
+
+# (score, needs_review) for chunks missing from the validation report
+_NO_VALIDATION = (0.0, True)
+
+@functools.lru_cache(maxsize=1024)
+def _indent_code(code: str, indent_level: int) -> str:
+    # Repeated chunks (e.g. generated accessors) are indented once
+    return _CONTENT_LINE_RE.sub("    " * indent_level, code)
+
+@dataclass(slots=True)
 class AssemblyChunk:
     """Chunk for assembly"""
     chunk_id: str
@@ -18,6 +55,11 @@ class AssemblyChunk:
     validation_score: float
     needs_review: bool
     tree_path: str = ""
+    code_lines: int = field(init=False)
+    
+    def __post_init__(self):
+        # Same as len(kotlin_code.split('\n')) without building the list
+        self.code_lines = self.kotlin_code.count('\n') + 1
 
 class AIChunkAssembler:
     """Assembles validated AI chunks into final Kotlin file"""
@@ -30,39 +72,53 @@ class AIChunkAssembler:
             "review_flagged": 0
         }
         
-    def load_validation_report(self, report_file: str) -> Dict:
-        """Load validation report"""
-        with open(report_file, 'r') as f:
-            return json.load(f)
+    def load_validation_report(self, report_file: str) -> Dict[str, Tuple[float, bool]]:
+        """Load (score, needs_manual_review) from report, indexed by chunk_id"""
+        return {
+            item['chunk_id']: (item.get('score', 0.0), item.get('needs_manual_review', True))
+            for item in self._iter_validation_details(report_file)
+        }
     
-    def load_converted_chunks(self, chunks_dir: str, validation_report: Dict) -> List[AssemblyChunk]:
-        """Load converted chunks with validation data"""
+    def _iter_validation_details(self, report_file: str) -> Iterator[Dict]:
+        """Yield validation_details items, streaming with ijson when available"""
+        try:
+            import ijson
+        except ImportError:
+            with open(report_file, 'r') as f:
+                report = json.load(f)
+            yield from report.get('validation_details', [])
+            return
+        # Only validation_details is materialized; the rest of the report is skipped
+        with open(report_file, 'rb') as f:
+            yield from ijson.items(f, 'validation_details.item', use_float=True)
+    
+    def load_converted_chunks(self, chunks_dir: str, validation_details: Dict[str, Tuple[float, bool]]) -> List[AssemblyChunk]:
+        """Load converted chunks with validation data (see load_validation_report)"""
         chunks = []
-        validation_details = {
-            item['chunk_id']: item 
-            for item in validation_report.get('validation_details', [])
-        }
         
-        for kt_file in sorted(os.listdir(chunks_dir)):
-            if not kt_file.endswith('.kt'):
-                continue
-                
-            chunk_id = kt_file.replace('.kt', '')
-            chunk_path = os.path.join(chunks_dir, kt_file)
-            
-            # Load chunk content
-            with open(chunk_path, 'r') as f:
-                kotlin_code = f.read()
+        # scandir entries carry name/path/type, so no extra join or stat per file
+        entries = sorted(
+            (e for e in os.scandir(chunks_dir) if e.name.endswith('.kt') and e.is_file()),
+            key=lambda e: e.name
+        )
+        
+        # Reads release the GIL, so slow (e.g. network) filesystems are read
+        # concurrently; map() keeps the sorted order
+        with ThreadPoolExecutor(max_workers=min(32, (os.cpu_count() or 1) * 4)) as pool:
+            bodies = list(pool.map(read_text, [e.path for e in entries]))
+        
+        for entry, kotlin_code in zip(entries, bodies):
+            chunk_id = entry.name[:-3]  # strip the '.kt' suffix only
             
             # Get validation data
-            validation_data = validation_details.get(chunk_id, {})
+            score, needs_review = validation_details.get(chunk_id, _NO_VALIDATION)
             
             chunk = AssemblyChunk(
                 chunk_id=chunk_id,
                 kotlin_code=kotlin_code,
                 chunk_type=self._infer_chunk_type(chunk_id, kotlin_code),
-                validation_score=validation_data.get('score', 0.0),
-                needs_review=validation_data.get('needs_manual_review', True)
+                validation_score=score,
+                needs_review=needs_review
             )
             
             chunks.append(chunk)
@@ -71,16 +127,25 @@ class AIChunkAssembler:
     
     def _infer_chunk_type(self, chunk_id: str, kotlin_code: str) -> str:
         """Infer chunk type from ID and content"""
-        if 'function' in chunk_id or 'fun ' in kotlin_code:
+        if 'function' in chunk_id:
             return 'function'
-        elif 'class' in chunk_id or 'class ' in kotlin_code:
-            return 'class'
-        elif 'constructor' in chunk_id or 'init' in kotlin_code:
-            return 'constructor'
-        elif 'property' in chunk_id or 'val ' in kotlin_code or 'var ' in kotlin_code:
-            return 'property'
-        else:
-            return 'unknown'
+        # A well-named chunk_id decides the type unless the content carries a
+        # higher-priority marker; those few substring tests replace the full scan
+        for i, id_type in enumerate(_ID_TYPES):
+            if id_type in chunk_id:
+                for marker_type, marker in _MARKERS[:i + 1]:
+                    if marker in kotlin_code:
+                        return marker_type
+                return id_type
+        found = set()
+        for m in _TYPE_RE.finditer(kotlin_code):
+            if m.lastgroup == 'function':
+                return 'function'
+            found.add(m.lastgroup)
+        for id_type in _ID_TYPES:
+            if id_type in found:
+                return id_type
+        return 'unknown'
     
     def assemble_kotlin_file(self, 
                            chunks: List[AssemblyChunk],
@@ -101,8 +166,7 @@ class AIChunkAssembler:
         kotlin_content = self._apply_post_processing(kotlin_content)
         
         # Save file
-        with open(output_file, 'w') as f:
-            f.write(kotlin_content)
+        write_bytes(output_file, kotlin_content.encode('utf-8'))
         
         # Generate assembly report
         self._generate_assembly_report(chunks, output_file)
@@ -135,152 +199,134 @@ class AIChunkAssembler:
                             package_name: str) -> str:
         """Generate complete Kotlin file content"""
         
-        content_parts = []
+        buf = io.StringIO()
+        write = buf.write
+        
+        def emit(text: str):
+            write(text)
+            write("\n")
         
         # Package declaration
-        content_parts.append(f"package {package_name}\n")
+        emit(f"package {package_name}\n")
         
         # File header comment
-        content_parts.append("""
-///////////////////////////////////////////////////////////////////////////////
-//
-// file name  : Test.cpp -> {}.kt (AI Converted)
-// class name : {}
-// Copyright My Company Limited
-// Generated by AI-powered conversion workflow
-//
-//////////////////////////////////////////////////////////////////////////////
-""".format(class_name, class_name))
+        emit(_HEADER_TEMPLATE.format_map({"name": class_name}))
         
         # Imports (if any)
         if organized_chunks['imports']:
-            content_parts.append("// Imports")
+            emit("// Imports")
             for chunk in organized_chunks['imports']:
-                content_parts.append(chunk.kotlin_code)
-            content_parts.append("")
+                emit(chunk.kotlin_code)
+            emit("")
         
         # Constants (if any)
         if organized_chunks['constants']:
-            content_parts.append("// Constants")
+            emit("// Constants")
             for chunk in organized_chunks['constants']:
-                content_parts.append(chunk.kotlin_code)
-            content_parts.append("")
+                emit(chunk.kotlin_code)
+            emit("")
         
         # Class declaration
-        content_parts.append(f"class {class_name} {{")
+        emit(f"class {class_name} {{")
         
         # Properties
         if organized_chunks['properties']:
-            content_parts.append("    // Properties")
+            emit("    // Properties")
             for chunk in organized_chunks['properties']:
                 indented_code = self._indent_code(chunk.kotlin_code, 1)
-                content_parts.append(indented_code)
-            content_parts.append("")
+                emit(indented_code)
+            emit("")
         
         # Constructors
         if organized_chunks['constructors']:
-            content_parts.append("    // Constructors")
+            emit("    // Constructors")
             for chunk in organized_chunks['constructors']:
                 indented_code = self._indent_code(chunk.kotlin_code, 1)
-                content_parts.append(indented_code)
-            content_parts.append("")
+                emit(indented_code)
+            emit("")
         
         # Functions
         if organized_chunks['functions']:
-            content_parts.append("    // Functions")
+            emit("    // Functions")
             for chunk in organized_chunks['functions']:
                 # Add review comment if needed
                 if chunk.needs_review:
-                    content_parts.append(f"    // TODO: Manual review required (Score: {chunk.validation_score:.2f})")
+                    emit(f"    // TODO: Manual review required (Score: {chunk.validation_score:.2f})")
                 
                 indented_code = self._indent_code(chunk.kotlin_code, 1)
-                content_parts.append(indented_code)
-                content_parts.append("")
+                emit(indented_code)
+                emit("")
         
         # Unknown chunks
         if organized_chunks['unknown']:
-            content_parts.append("    // Other code")
+            emit("    // Other code")
             for chunk in organized_chunks['unknown']:
-                content_parts.append(f"    // Chunk: {chunk.chunk_id}")
+                emit(f"    // Chunk: {chunk.chunk_id}")
                 indented_code = self._indent_code(chunk.kotlin_code, 1)
-                content_parts.append(indented_code)
-                content_parts.append("")
+                emit(indented_code)
+                emit("")
         
         # Close class
-        content_parts.append("}")
+        write("}")
         
-        return "\n".join(content_parts)
+        return buf.getvalue()
     
     def _indent_code(self, code: str, indent_level: int) -> str:
         """Indent code by specified level"""
-        indent = "    " * indent_level
-        lines = code.split('\n')
-        indented_lines = [indent + line if line.strip() else line for line in lines]
-        return '\n'.join(indented_lines)
+        return _indent_code(code, indent_level)
     
     def _apply_post_processing(self, kotlin_content: str) -> str:
         """Apply post-processing fixes"""
-        # Remove empty lines at beginning/end of functions
-        lines = kotlin_content.split('\n')
-        processed_lines = []
-        
-        in_function = False
-        for i, line in enumerate(lines):
-            if line.strip().startswith('fun ') or line.strip().startswith('private fun '):
-                in_function = True
-                processed_lines.append(line)
-            elif in_function and line.strip() == '}':
-                in_function = False
-                processed_lines.append(line)
-            elif in_function and not line.strip() and i > 0 and not lines[i-1].strip():
-                # Skip duplicate empty lines in functions
-                continue
-            else:
-                processed_lines.append(line)
-        
-        return '\n'.join(processed_lines)
+        # Collapse runs of empty lines inside functions (fun line .. closing '}' line)
+        return _FUNC_BODY_RE.sub(lambda m: _BLANK_RUN_RE.sub(r'\1', m.group(0)), kotlin_content)
     
     def _generate_assembly_report(self, chunks: List[AssemblyChunk], output_file: str):
         """Generate assembly report"""
+        assembled = 0
+        total_score = 0.0
+        chunk_details = []
+        review_chunks = []
+        for c in chunks:
+            score = c.validation_score
+            total_score += score
+            if score > 0.5:
+                assembled += 1
+            chunk_details.append({
+                "chunk_id": c.chunk_id,
+                "chunk_type": c.chunk_type,
+                "validation_score": score,
+                "needs_review": c.needs_review,
+                "code_lines": c.code_lines
+            })
+            if c.needs_review:
+                review_chunks.append({
+                    "chunk_id": c.chunk_id,
+                    "chunk_type": c.chunk_type,
+                    "validation_score": score,
+                    "reason": "Low validation score" if score < 0.7 else "Flagged for review"
+                })
+        
         report = {
             "assembly_summary": {
                 "total_chunks": len(chunks),
-                "assembled_chunks": len([c for c in chunks if c.validation_score > 0.5]),
-                "review_required": len([c for c in chunks if c.needs_review]),
-                "average_validation_score": sum(c.validation_score for c in chunks) / len(chunks) if chunks else 0,
+                "assembled_chunks": assembled,
+                "review_required": len(review_chunks),
+                "average_validation_score": total_score / len(chunks) if chunks else 0,
                 "output_file": output_file
             },
-            "chunk_details": [
-                {
-                    "chunk_id": c.chunk_id,
-                    "chunk_type": c.chunk_type,
-                    "validation_score": c.validation_score,
-                    "needs_review": c.needs_review,
-                    "code_lines": len(c.kotlin_code.split('\n'))
-                }
-                for c in chunks
-            ],
-            "review_required_chunks": [
-                {
-                    "chunk_id": c.chunk_id,
-                    "chunk_type": c.chunk_type,
-                    "validation_score": c.validation_score,
-                    "reason": "Low validation score" if c.validation_score < 0.7 else "Flagged for review"
-                }
-                for c in chunks if c.needs_review
-            ]
+            "chunk_details": chunk_details,
+            "review_required_chunks": review_chunks
         }
         
         report_file = output_file.replace('.kt', '_assembly_report.json')
-        with open(report_file, 'w') as f:
-            json.dump(report, f, indent=2)
+        write_bytes(report_file, dump_json(report))
         
         print(f"📊 Assembly report saved to: {report_file}")
         
         # Update stats
         self.assembly_stats["total_chunks"] = len(chunks)
-        self.assembly_stats["assembled_chunks"] = len([c for c in chunks if c.validation_score > 0.5])
-        self.assembly_stats["review_flagged"] = len([c for c in chunks if c.needs_review])
+        self.assembly_stats["assembled_chunks"] = assembled
+        self.assembly_stats["review_flagged"] = len(review_chunks)
     
     def print_assembly_summary(self):
         """Print assembly statistics"""
@@ -326,10 +372,10 @@ def main():
     print(f"📄 Output file: {args.output}")
     
     # Load validation report
-    validation_report = assembler.load_validation_report(args.validation_report)
+    validation_details = assembler.load_validation_report(args.validation_report)
     
     # Load converted chunks
-    chunks = assembler.load_converted_chunks(args.converted_chunks_dir, validation_report)
+    chunks = assembler.load_converted_chunks(args.converted_chunks_dir, validation_details)
     print(f"📦 Loaded {len(chunks)} chunks for assembly")
     
     # Assemble Kotlin file
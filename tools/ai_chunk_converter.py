@@ -4,12 +4,21 @@ AI-Powered Chunk Converter
 Leverages external AI models (GPT-4.1, Claude, etc.) for intelligent C++ to Kotlin conversion
 """
 import os
+import re
 import json
 import argparse
+import logging
 import asyncio
 from typing import Dict, List, Optional, Tuple
 from dataclasses import dataclass
 from enum import Enum
+from chunk_common import COMMENT_RE, LINE_COMMENT_RE, dump_json, read_text, write_bytes
+
+# Per-chunk progress; shown with --verbose, warnings always
+logger = logging.getLogger("ai-chunk-converter")
+
+# First line containing '::', '(' and ')' in any order
+_SIG_RE = re.compile(r'^(?=[^\n]*::)(?=[^\n]*\()(?=[^\n]*\))[^\n]*', re.MULTILINE)
 
 class ModelType(Enum):
     """Available AI models for chunk conversion"""
@@ -43,8 +52,9 @@ class ConversionRequest:
 class AIChunkConverter:
     """AI-powered chunk converter using external models"""
     
-    def __init__(self, model_type: ModelType = ModelType.GPT_4_1):
+    def __init__(self, model_type: ModelType = ModelType.GPT_4_1, max_concurrent: int = 8):
         self.model_type = model_type
+        self.max_concurrent = max_concurrent
         self.conversion_stats = {
             "total_chunks": 0,
             "successful_conversions": 0,
@@ -123,7 +133,7 @@ Do not include explanations or markdown formatting.
         # - Custom MCP server endpoints
         
         # Mock implementation for now
-        print(f"🤖 Calling {self.model_type.value} for conversion...")
+        logger.info("🤖 Calling %s for conversion...", self.model_type.value)
         await asyncio.sleep(0.1)  # Simulate API call
         
         # In real implementation, return actual AI response
@@ -138,13 +148,9 @@ Do not include explanations or markdown formatting.
         if "AI_CONVERSION_PLACEHOLDER" in kotlin_code:
             return False
             
-        # Check comment preservation
-        cpp_comment_lines = [line.strip() for line in cpp_code.split('\n') if line.strip().startswith('//')]
-        kotlin_comment_lines = [line.strip() for line in kotlin_code.split('\n') if line.strip().startswith('//')]
-        
-        # Should have similar number of comments
-        if len(cpp_comment_lines) > 0 and len(kotlin_comment_lines) == 0:
-            print(f"⚠️ Warning: Comments may have been lost in conversion")
+        # Check comment preservation: stop at the first // line on each side
+        if LINE_COMMENT_RE.search(cpp_code) and not LINE_COMMENT_RE.search(kotlin_code):
+            logger.warning("⚠️ Warning: Comments may have been lost in conversion")
             return False
             
         return True
@@ -157,8 +163,6 @@ Do not include explanations or markdown formatting.
         with open(manifest_file, 'r') as f:
             manifest = json.load(f)
         
-        converted_chunks = {}
-        
         # Get chunk list from the manifest structure
         chunk_list = []
         if 'chunk_tree' in manifest and 'root' in manifest['chunk_tree']:
@@ -167,66 +171,79 @@ Do not include explanations or markdown formatting.
             chunk_list = [chunk['chunk_id'] if isinstance(chunk, dict) else chunk 
                          for chunk in manifest['chunks']]
         else:
-            # Fallback: get all .cpp files in chunks directory
-            chunk_list = [f.replace('.cpp', '') for f in os.listdir(chunks_dir) if f.endswith('.cpp')]
+            # Fallback: get all .cpp files in chunks directory, stripping only the '.cpp' suffix
+            chunk_list = [e.name[:-4] for e in os.scandir(chunks_dir)
+                         if e.name.endswith('.cpp') and e.is_file()]
         
         print(f"Processing {len(chunk_list)} chunks for AI conversion...")
         
-        for chunk_id in chunk_list:
-            if isinstance(chunk_id, str):
-                chunk_file = os.path.join(chunks_dir, f"{chunk_id}.cpp")
-                
-                if os.path.exists(chunk_file):
-                    print(f"🔄 Converting chunk: {chunk_id}")
-                    
-                    # Load chunk content
-                    with open(chunk_file, 'r') as f:
-                        cpp_code = f.read()
-                    
-                    # Create conversion context
-                    context = ChunkConversionContext(
-                        chunk_id=chunk_id,
-                        cpp_code=cpp_code,
-                        chunk_type=self._infer_chunk_type(chunk_id),
-                        dependencies=[],
-                        comments=self._extract_comments(cpp_code),
-                        function_signature=self._extract_function_signature(chunk_id, cpp_code),
-                        tree_path=f"root.{chunk_id}"
-                    )
-                    
-                    # Convert with AI
-                    success, kotlin_code = asyncio.run(self.convert_chunk_with_ai(context))
-                    
-                    # Save converted chunk
-                    output_file = os.path.join(output_dir, f"{chunk_id}.kt")
-                    with open(output_file, 'w') as f:
-                        f.write(kotlin_code)
-                    
-                    converted_chunks[chunk_id] = {
-                        "success": success,
-                        "output_file": output_file,
-                        "chunk_type": context.chunk_type,
-                        "model_used": self.model_type.value
-                    }
-                    
-                    if not success:
-                        self.conversion_stats["manual_review_flagged"] += 1
-                        print(f"⚠️ Chunk {chunk_id} needs manual review")
-                    else:
-                        print(f"✅ Chunk {chunk_id} converted successfully")
+        # Chunks convert concurrently; gather keeps results in manifest order
+        results = asyncio.run(self._process_all(chunks_dir, output_dir, chunk_list))
+        converted_chunks = {chunk_id: info for chunk_id, info in results if info is not None}
         
         self.conversion_stats["total_chunks"] = len(chunk_list)
         
         # Save conversion results
         results_file = os.path.join(output_dir, "conversion_results.json")
-        with open(results_file, 'w') as f:
-            json.dump({
-                "converted_chunks": converted_chunks,
-                "stats": self.conversion_stats
-            }, f, indent=2)
+        write_bytes(results_file, dump_json({
+            "converted_chunks": converted_chunks,
+            "stats": self.conversion_stats
+        }))
         
         self._print_conversion_summary()
     
+    async def _process_all(self, chunks_dir: str, output_dir: str, chunk_list: List) -> List[Tuple[str, Optional[Dict]]]:
+        """Convert all chunks with at most max_concurrent AI calls in flight"""
+        sem = asyncio.Semaphore(self.max_concurrent)
+        
+        async def one(chunk_id: str) -> Tuple[str, Optional[Dict]]:
+            async with sem:
+                return chunk_id, await self._process_chunk(chunks_dir, output_dir, chunk_id)
+        
+        return await asyncio.gather(*(one(chunk_id) for chunk_id in chunk_list if isinstance(chunk_id, str)))
+    
+    async def _process_chunk(self, chunks_dir: str, output_dir: str, chunk_id: str) -> Optional[Dict]:
+        """Convert a single chunk file; returns its result entry, or None if the file is missing"""
+        chunk_file = os.path.join(chunks_dir, f"{chunk_id}.cpp")
+        if not os.path.exists(chunk_file):
+            return None
+        
+        logger.info("🔄 Converting chunk: %s", chunk_id)
+        
+        # Load chunk content (file I/O stays off the event loop)
+        cpp_code = await asyncio.to_thread(read_text, chunk_file)
+        
+        # Create conversion context
+        context = ChunkConversionContext(
+            chunk_id=chunk_id,
+            cpp_code=cpp_code,
+            chunk_type=self._infer_chunk_type(chunk_id),
+            dependencies=[],
+            comments=self._extract_comments(cpp_code),
+            function_signature=self._extract_function_signature(chunk_id, cpp_code),
+            tree_path=f"root.{chunk_id}"
+        )
+        
+        # Convert with AI
+        success, kotlin_code = await self.convert_chunk_with_ai(context)
+        
+        # Save converted chunk
+        output_file = os.path.join(output_dir, f"{chunk_id}.kt")
+        await asyncio.to_thread(write_bytes, output_file, kotlin_code.encode('utf-8'))
+        
+        if not success:
+            self.conversion_stats["manual_review_flagged"] += 1
+            logger.warning("⚠️ Chunk %s needs manual review", chunk_id)
+        else:
+            logger.info("✅ Chunk %s converted successfully", chunk_id)
+        
+        return {
+            "success": success,
+            "output_file": output_file,
+            "chunk_type": context.chunk_type,
+            "model_used": self.model_type.value
+        }
+    
     def _infer_chunk_type(self, chunk_id: str) -> str:
         """Infer chunk type from chunk ID"""
         if 'function' in chunk_id:
@@ -240,21 +257,14 @@ Do not include explanations or markdown formatting.
     
     def _extract_comments(self, cpp_code: str) -> List[str]:
         """Extract comments from C++ code"""
-        comments = []
-        lines = cpp_code.split('\n')
-        for line in lines:
-            stripped = line.strip()
-            if stripped.startswith('//') or stripped.startswith('/*'):
-                comments.append(stripped)
-        return comments
+        return COMMENT_RE.findall(cpp_code)
     
     def _extract_function_signature(self, chunk_id: str, cpp_code: str) -> Optional[str]:
         """Extract function signature if this is a function chunk"""
         if 'function' in chunk_id:
-            lines = cpp_code.split('\n')
-            for line in lines:
-                if '::' in line and '(' in line and ')' in line:
-                    return line.strip()
+            m = _SIG_RE.search(cpp_code)
+            if m:
+                return m.group(0).strip()
         return None
     
     def _print_conversion_summary(self):
@@ -302,7 +312,7 @@ class MCPServerIntegration:
         }
         
         # Mock MCP server call
-        print(f"📡 Calling MCP server for chunk conversion...")
+        logger.info("📡 Calling MCP server for chunk conversion...")
         await asyncio.sleep(0.1)
         
         # In real implementation, make HTTP request to MCP server
@@ -318,12 +328,17 @@ def main():
                        default=ModelType.GPT_4_1.value,
                        help="AI model to use for conversion")
     parser.add_argument("--mcp-server", help="Use MCP server for conversion")
+    parser.add_argument("--max-concurrent", type=int, default=8,
+                       help="Maximum number of chunks converted concurrently")
+    parser.add_argument("--verbose", action="store_true",
+                       help="Log progress for every chunk")
     
     args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING, format="%(message)s")
     
     # Create converter
     model_type = ModelType(args.model)
-    converter = AIChunkConverter(model_type)
+    converter = AIChunkConverter(model_type, args.max_concurrent)
     
     print(f"🚀 Starting AI-powered chunk conversion with {model_type.value}")
     print(f"📁 Input: {args.chunks_dir}")
@@ -5,50 +5,17 @@ Validates AI-converted chunks using high-capability models for quality assurance
 """
 import os
 import json
+import hashlib
 import argparse
 import asyncio
-from typing import Dict, List, Tuple, Optional
+from typing import AsyncIterator, Dict, Iterator, List, Tuple, Optional
+from concurrent.futures import ProcessPoolExecutor
 from dataclasses import dataclass
 from enum import Enum
+from chunk_common import dump_json, dump_json_compact, loads, read_text, write_bytes_atomic
 
-@dataclass
-class ValidationResult:
-    """Result of chunk validation"""
-    chunk_id: str
-    is_valid: bool
-    score: float  # 0.0 to 1.0
-    issues: List[str]
-    recommendations: List[str]
-    needs_manual_review: bool
-    
-@dataclass 
-class ValidationCriteria:
-    """Validation criteria for AI conversions"""
-    comment_preservation: bool = True
-    business_logic_accuracy: bool = True
-    kotlin_syntax_correctness: bool = True
-    null_safety_compliance: bool = True
-    idiomatic_kotlin: bool = True
-    performance_considerations: bool = False
-
-class AIChunkValidator:
-    """Validates AI-converted chunks for quality assurance"""
-    
-    def __init__(self, validation_model: str = "claude-3-5-sonnet"):
-        self.validation_model = validation_model
-        self.validation_stats = {
-            "total_validated": 0,
-            "passed_validation": 0,
-            "failed_validation": 0,
-            "manual_review_required": 0
-        }
-        
-    def create_validation_prompt(self, 
-                               original_cpp: str, 
-                               converted_kotlin: str,
-                               criteria: ValidationCriteria) -> str:
-        """Create validation prompt for AI model"""
-        prompt = f"""
+# Static parts of the validation prompts, joined around the chunk code
+_VALIDATION_PROMPT_HEADER = """
 Validate this C++ to Kotlin conversion for quality and accuracy.
 
 **VALIDATION CRITERIA:**
@@ -60,12 +27,14 @@ Validate this C++ to Kotlin conversion for quality and accuracy.
 
 **ORIGINAL C++ CODE:**
 ```cpp
-{original_cpp}
+"""
+_VALIDATION_PROMPT_MID = """
 ```
 
 **CONVERTED KOTLIN CODE:**
 ```kotlin
-{converted_kotlin}
+"""
+_VALIDATION_PROMPT_TAIL = """
 ```
 
 **VALIDATION INSTRUCTIONS:**
@@ -77,22 +46,197 @@ Validate this C++ to Kotlin conversion for quality and accuracy.
 
 **OUTPUT FORMAT:**
 Provide validation in this JSON format:
-{{
+{
   "is_valid": true/false,
   "score": 0.0-1.0,
   "issues": ["issue1", "issue2"],
   "recommendations": ["rec1", "rec2"],
   "needs_manual_review": true/false,
-  "validation_details": {{
+  "validation_details": {
     "comment_preservation": "pass/fail/warning",
     "business_logic": "pass/fail/warning", 
     "kotlin_syntax": "pass/fail/warning",
     "null_safety": "pass/fail/warning",
     "idiomatic_kotlin": "pass/fail/warning"
-  }}
-}}
+  }
+}
+"""
+_BATCH_PROMPT_HEADER = """
+Validate each of the following {count} C++ to Kotlin conversions for quality and accuracy.
+Judge every chunk independently.
+
+**VALIDATION CRITERIA:**
+1. Comment Preservation: Are ALL C++ comments preserved exactly?
+2. Business Logic: Is the algorithm/logic identical to C++?
+3. Kotlin Syntax: Is the Kotlin code syntactically correct and idiomatic?
+4. Null Safety: Are null safety patterns properly applied?
+5. Type Conversion: Are C++ types correctly converted to Kotlin equivalents?
+
+"""
+_BATCH_PROMPT_TAIL = """
+**OUTPUT FORMAT:**
+Provide one entry per chunk, in this JSON format:
+{
+  "results": [
+    {
+      "chunk_id": "id from the CHUNK heading",
+      "is_valid": true/false,
+      "score": 0.0-1.0,
+      "issues": ["issue1", "issue2"],
+      "recommendations": ["rec1", "rec2"],
+      "needs_manual_review": true/false
+    }
+  ]
+}
 """
-        return prompt
+_BATCH_SECTION_CPP = "\n\n**ORIGINAL C++ CODE:**\n```cpp\n"
+
+# Issues of results that come from errors rather than a model verdict; never cached
+_TRANSIENT_ISSUES = ("Validation error:", "Failed to parse validation response",
+                     "No validation result returned for chunk")
+
+def _write_rows(f, rows: Iterator[Dict]):
+    """Write rows as a JSON array nested one level in an indent=2 document"""
+    first = True
+    for row in rows:
+        f.write(b"[\n    " if first else b",\n    ")
+        f.write(dump_json(row).replace(b"\n", b"\n    "))
+        first = False
+    f.write(b"[]" if first else b"\n  ]")
+
+@dataclass(frozen=True, slots=True)
+class ValidationResult:
+    """Result of chunk validation"""
+    chunk_id: str
+    is_valid: bool
+    score: float  # 0.0 to 1.0
+    issues: List[str]
+    recommendations: List[str]
+    needs_manual_review: bool
+    
+@dataclass(frozen=True, slots=True)
+class ValidationCriteria:
+    """Validation criteria for AI conversions"""
+    comment_preservation: bool = True
+    business_logic_accuracy: bool = True
+    kotlin_syntax_correctness: bool = True
+    null_safety_compliance: bool = True
+    idiomatic_kotlin: bool = True
+    performance_considerations: bool = False
+
+# Response parsing is module-level so large replies can be parsed in a worker process
+def _error_result(chunk_id: str, issue: str) -> ValidationResult:
+    """Failed result that sends the chunk to manual review"""
+    return ValidationResult(
+        chunk_id=chunk_id,
+        is_valid=False,
+        score=0.0,
+        issues=[issue],
+        recommendations=["Manual review required"],
+        needs_manual_review=True
+    )
+
+def _parse_validation_response(response: str, chunk_id: str) -> ValidationResult:
+    """Parse AI validation response"""
+    try:
+        data = loads(response)
+        return ValidationResult(
+            chunk_id=chunk_id,
+            is_valid=data.get("is_valid", False),
+            score=data.get("score", 0.0),
+            issues=data.get("issues", []),
+            recommendations=data.get("recommendations", []),
+            needs_manual_review=data.get("needs_manual_review", True)
+        )
+    except json.JSONDecodeError:
+        return _error_result(chunk_id, "Failed to parse validation response")
+
+def _parse_validation_response_batch(response: str, chunk_ids: List[str]) -> List[ValidationResult]:
+    """Parse a batched validation response into one result per chunk_id, in order"""
+    try:
+        entries = loads(response)["results"]
+    except (json.JSONDecodeError, KeyError, TypeError):
+        return [_error_result(chunk_id, "Failed to parse validation response") for chunk_id in chunk_ids]
+
+    by_id = {entry.get("chunk_id"): entry for entry in entries if isinstance(entry, dict)}
+    results = []
+    for chunk_id in chunk_ids:
+        data = by_id.get(chunk_id)
+        if data is None:
+            results.append(_error_result(chunk_id, "No validation result returned for chunk"))
+            continue
+        results.append(ValidationResult(
+            chunk_id=chunk_id,
+            is_valid=data.get("is_valid", False),
+            score=data.get("score", 0.0),
+            issues=data.get("issues", []),
+            recommendations=data.get("recommendations", []),
+            needs_manual_review=data.get("needs_manual_review", True)
+        ))
+    return results
+
+class JSONAccumulator:
+    """Streamed response text deltas, joined once when the stream ends"""
+    
+    def __init__(self):
+        self.parts: List[str] = []
+    
+    def append(self, chunk: str):
+        self.parts.append(chunk)
+    
+    def finish(self) -> str:
+        # No interim parse attempts: the reply is decoded once, by the response parser
+        return "".join(self.parts)
+
+async def _mock_event_stream(text: str, delta_size: int = 64) -> AsyncIterator[bytes]:
+    """Yield text as SSE data events, as a streaming provider would"""
+    for i in range(0, len(text), delta_size):
+        yield b"data: " + json.dumps(text[i:i + delta_size]).encode() + b"\n"
+    yield b"data: [DONE]\n"
+
+class AIChunkValidator:
+    """Validates AI-converted chunks for quality assurance"""
+    
+    # Batched validation: chunks per model call, and the code size one call may carry
+    MAX_BATCH_SIZE = 16
+    MAX_BATCH_PROMPT_CHARS = 60_000
+    # Replies at least this long are parsed in a worker process, off the event loop
+    PROCESS_PARSE_MIN_CHARS = 1 << 20
+    
+    def __init__(self, validation_model: str = "claude-3-5-sonnet", max_concurrent: int = 8,
+                 cache_file: Optional[str] = None):
+        self.validation_model = validation_model
+        self.max_concurrent = max_concurrent
+        # Results of earlier runs keyed by content hash (see _cache_key); None disables it
+        self.cache_file = cache_file
+        self._cache: Dict[str, Dict] = {}
+        self._parse_pool: Optional[ProcessPoolExecutor] = None
+        self.validation_stats = {
+            "total_validated": 0,
+            "passed_validation": 0,
+            "failed_validation": 0,
+            "manual_review_required": 0
+        }
+        
+    def create_validation_prompt(self, 
+                               original_cpp: str, 
+                               converted_kotlin: str,
+                               criteria: ValidationCriteria) -> str:
+        """Create validation prompt for AI model"""
+        return "".join((_VALIDATION_PROMPT_HEADER, original_cpp, _VALIDATION_PROMPT_MID,
+                        converted_kotlin, _VALIDATION_PROMPT_TAIL))
+    
+    def create_batched_validation_prompt(self, pairs: List[Tuple[str, str, str]]) -> str:
+        """Create one validation prompt covering several (chunk_id, cpp, kotlin) pairs"""
+        # Each section is "### CHUNK i: id" followed by the same two code blocks as the single prompt
+        parts = [_BATCH_PROMPT_HEADER.format(count=len(pairs))]
+        for i, (chunk_id, original_cpp, converted_kotlin) in enumerate(pairs, 1):
+            if i > 1:
+                parts.append("\n")
+            parts += ("### CHUNK ", str(i), ": ", chunk_id, _BATCH_SECTION_CPP, original_cpp,
+                      _VALIDATION_PROMPT_MID, converted_kotlin, "\n```\n")
+        parts.append(_BATCH_PROMPT_TAIL)
+        return "".join(parts)
         
     async def validate_conversion(self, 
                                 original_cpp: str,
@@ -107,32 +251,54 @@ Provide validation in this JSON format:
             validation_response = await self._call_validation_model(prompt)
             
             # Parse validation result
-            result = self._parse_validation_response(validation_response, chunk_id)
+            result = await self._parse(_parse_validation_response, validation_response, chunk_id)
             
-            # Update stats
-            self.validation_stats["total_validated"] += 1
-            if result.is_valid:
-                self.validation_stats["passed_validation"] += 1
-            else:
-                self.validation_stats["failed_validation"] += 1
-            
-            if result.needs_manual_review:
-                self.validation_stats["manual_review_required"] += 1
-                
+            self._record_result(result)
             return result
             
         except Exception as e:
-            return ValidationResult(
-                chunk_id=chunk_id,
-                is_valid=False,
-                score=0.0,
-                issues=[f"Validation error: {e}"],
-                recommendations=["Manual review required"],
-                needs_manual_review=True
-            )
+            return _error_result(chunk_id, f"Validation error: {e}")
+    
+    async def validate_batch(self,
+                             pairs: List[Tuple[str, str, str]],
+                             criteria: ValidationCriteria) -> List[ValidationResult]:
+        """Validate several (chunk_id, cpp, kotlin) pairs with a single model call"""
+        if len(pairs) == 1:
+            chunk_id, original_cpp, converted_kotlin = pairs[0]
+            return [await self.validate_conversion(original_cpp, converted_kotlin, chunk_id, criteria)]
+        
+        chunk_ids = [chunk_id for chunk_id, _, _ in pairs]
+        try:
+            prompt = self.create_batched_validation_prompt(pairs)
+            validation_response = await self._call_validation_model(prompt, chunk_ids)
+            results = await self._parse(_parse_validation_response_batch, validation_response, chunk_ids)
+        except Exception as e:
+            return [_error_result(chunk_id, f"Validation error: {e}") for chunk_id in chunk_ids]
+        
+        for result in results:
+            self._record_result(result)
+        return results
+    
+    def _record_result(self, result: ValidationResult):
+        """Update stats for one validated chunk"""
+        self.validation_stats["total_validated"] += 1
+        if result.is_valid:
+            self.validation_stats["passed_validation"] += 1
+        else:
+            self.validation_stats["failed_validation"] += 1
+        
+        if result.needs_manual_review:
+            self.validation_stats["manual_review_required"] += 1
+    
+    async def _parse(self, parser, response: str, *args):
+        """Run a response parser, in the process pool when the reply is large"""
+        if self._parse_pool is None or len(response) < self.PROCESS_PARSE_MIN_CHARS:
+            return parser(response, *args)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._parse_pool, parser, response, *args)
     
-    async def _call_validation_model(self, prompt: str) -> str:
-        """Call AI model for validation"""
+    async def _call_validation_model(self, prompt: str, chunk_ids: Optional[List[str]] = None) -> str:
+        """Call AI model for validation (a batched prompt when chunk_ids is given)"""
         print(f"🔍 Validating with {self.validation_model}...")
         await asyncio.sleep(0.1)  # Simulate API call
         
@@ -152,29 +318,122 @@ Provide validation in this JSON format:
             }
         }
         
-        return json.dumps(mock_response)
+        if chunk_ids is not None:
+            mock_text = json.dumps({"results": [dict(mock_response, chunk_id=chunk_id) for chunk_id in chunk_ids]})
+        else:
+            mock_text = json.dumps(mock_response)
+        
+        # Real providers stream the reply; the mock goes through the same reader
+        return await self._read_event_stream(_mock_event_stream(mock_text))
+    
+    async def _read_event_stream(self, lines: AsyncIterator[bytes]) -> str:
+        """Collect an SSE reply (e.g. aiohttp response.content) whose data events are JSON-encoded text deltas"""
+        acc = JSONAccumulator()
+        async for line in lines:
+            if not line.startswith(b"data:"):
+                continue
+            payload = line[5:].strip()
+            if payload == b"[DONE]":
+                break
+            acc.append(json.loads(payload))
+        # Joined once, at [DONE] or when a provider without one ends the stream
+        return acc.finish()
+    
+    def _plan_batches(self, pairs: List[Tuple[str, str, str]]) -> List[List[Tuple[str, str, str]]]:
+        """Group pairs into batches of up to MAX_BATCH_SIZE chunks within MAX_BATCH_PROMPT_CHARS"""
+        batches = []
+        batch = []
+        batch_chars = 0
+        for pair in pairs:
+            pair_chars = len(pair[1]) + len(pair[2])
+            if batch and (len(batch) >= self.MAX_BATCH_SIZE or
+                          batch_chars + pair_chars > self.MAX_BATCH_PROMPT_CHARS):
+                batches.append(batch)
+                batch = []
+                batch_chars = 0
+            batch.append(pair)
+            batch_chars += pair_chars
+        if batch:
+            batches.append(batch)
+        return batches
+    
+    async def _validate_sources(self,
+                                sources: List[Tuple[str, str, str]],
+                                criteria: ValidationCriteria) -> List[ValidationResult]:
+        """Read every (chunk_id, cpp_path, kt_path) source, then validate in batches"""
+        pairs = await asyncio.gather(*(self._read_pair(*source) for source in sources))
+        if self.cache_file is None:
+            return await self._validate_batches(self._plan_batches(pairs), criteria)
+        
+        # Unchanged pairs reuse the cached result and skip the model call
+        keys = [self._cache_key(original_cpp, converted_kotlin, criteria)
+                for _, original_cpp, converted_kotlin in pairs]
+        results: List[Optional[ValidationResult]] = [None] * len(pairs)
+        misses = []
+        for i, (pair, key) in enumerate(zip(pairs, keys)):
+            cached = self._cache.get(key)
+            if cached is None:
+                misses.append(i)
+            else:
+                results[i] = ValidationResult(chunk_id=pair[0], **cached)
+                self._record_result(results[i])
+        
+        fresh = await self._validate_batches(self._plan_batches([pairs[i] for i in misses]), criteria)
+        for i, result in zip(misses, fresh):
+            results[i] = result
+            if not (result.issues and result.issues[0].startswith(_TRANSIENT_ISSUES)):
+                self._cache[keys[i]] = {
+                    "is_valid": result.is_valid,
+                    "score": result.score,
+                    "issues": result.issues,
+                    "recommendations": result.recommendations,
+                    "needs_manual_review": result.needs_manual_review
+                }
+        return results
     
-    def _parse_validation_response(self, response: str, chunk_id: str) -> ValidationResult:
-        """Parse AI validation response"""
+    def _cache_key(self, original_cpp: str, converted_kotlin: str, criteria: ValidationCriteria) -> str:
+        """Digest of everything that decides a validation result"""
+        h = hashlib.blake2b(digest_size=20)
+        for part in (original_cpp, converted_kotlin, repr(criteria), self.validation_model):
+            data = part.encode('utf-8')
+            h.update(len(data).to_bytes(8, 'little'))
+            h.update(data)
+        return h.hexdigest()
+    
+    def _load_cache(self):
+        if self.cache_file is None:
+            return
         try:
-            data = json.loads(response)
-            return ValidationResult(
-                chunk_id=chunk_id,
-                is_valid=data.get("is_valid", False),
-                score=data.get("score", 0.0),
-                issues=data.get("issues", []),
-                recommendations=data.get("recommendations", []),
-                needs_manual_review=data.get("needs_manual_review", True)
-            )
-        except json.JSONDecodeError:
-            return ValidationResult(
-                chunk_id=chunk_id,
-                is_valid=False,
-                score=0.0,
-                issues=["Failed to parse validation response"],
-                recommendations=["Manual review required"],
-                needs_manual_review=True
-            )
+            with open(self.cache_file, 'rb') as f:
+                self._cache = loads(f.read())
+        except (FileNotFoundError, json.JSONDecodeError):
+            self._cache = {}
+    
+    def _save_cache(self):
+        if self.cache_file is None:
+            return
+        write_bytes_atomic(self.cache_file, dump_json_compact(self._cache))
+    
+    async def _read_pair(self, chunk_id: str, cpp_path: str, kt_path: str) -> Tuple[str, str, str]:
+        """Read one chunk's C++ and Kotlin text in worker threads, off the event loop"""
+        original_cpp, converted_kotlin = await asyncio.gather(
+            asyncio.to_thread(read_text, cpp_path),
+            asyncio.to_thread(read_text, kt_path)
+        )
+        return chunk_id, original_cpp, converted_kotlin
+    
+    async def _validate_batches(self,
+                                batches: List[List[Tuple[str, str, str]]],
+                                criteria: ValidationCriteria) -> List[ValidationResult]:
+        """Validate all batches with at most max_concurrent model calls in flight; results keep the batch order"""
+        sem = asyncio.Semaphore(self.max_concurrent)
+        
+        async def one(batch: List[Tuple[str, str, str]]) -> List[ValidationResult]:
+            async with sem:
+                return await self.validate_batch(batch, criteria)
+        
+        batch_results = await asyncio.gather(*(one(batch) for batch in batches))
+        return [result for results in batch_results for result in results]
     
     def validate_conversion_directory(self, 
                                     converted_chunks_dir: str,
@@ -182,41 +441,38 @@ Provide validation in this JSON format:
                                     output_report: str,
                                     criteria: ValidationCriteria):
         """Validate all converted chunks in directory"""
-        validation_results = []
+        sources = []
         
-        converted_files = [f for f in os.listdir(converted_chunks_dir) if f.endswith('.kt')]
+        # scandir entries carry name and path; one listing replaces a stat per chunk
+        with os.scandir(converted_chunks_dir) as it:
+            converted_files = [(e.name, e.path) for e in it if e.name.endswith('.kt') and e.is_file()]
+        original_files = set(os.listdir(original_chunks_dir))
         
-        for kt_file in converted_files:
-            chunk_id = kt_file.replace('.kt', '')
-            cpp_file = f"{chunk_id}.cpp"
+        for kt_file, kt_path in converted_files:
+            chunk_id = kt_file[:-3]  # strip the '.kt' suffix only
+            cpp_file = chunk_id + '.cpp'
             
-            kt_path = os.path.join(converted_chunks_dir, kt_file)
-            cpp_path = os.path.join(original_chunks_dir, cpp_file)
-            
-            if os.path.exists(cpp_path):
+            if cpp_file in original_files:
                 print(f"🔍 Validating {chunk_id}...")
-                
-                # Read files
-                with open(cpp_path, 'r') as f:
-                    original_cpp = f.read()
-                with open(kt_path, 'r') as f:
-                    converted_kotlin = f.read()
-                
-                # Validate
-                result = asyncio.run(self.validate_conversion(
-                    original_cpp, converted_kotlin, chunk_id, criteria
-                ))
-                
-                validation_results.append(result)
-                
-                # Print result
-                status = "✅ PASS" if result.is_valid else "❌ FAIL"
-                review = " 🔍 REVIEW" if result.needs_manual_review else ""
-                print(f"  {status} (Score: {result.score:.2f}){review}")
-                
-                if result.issues:
-                    for issue in result.issues:
-                        print(f"    ⚠️ {issue}")
+                sources.append((chunk_id, os.path.join(original_chunks_dir, cpp_file), kt_path))
+        
+        # Several chunks share one model call; one event loop runs every batch
+        self._load_cache()
+        # Workers are only started if a reply is large enough to need one
+        with ProcessPoolExecutor(max_workers=os.cpu_count()) as self._parse_pool:
+            validation_results = asyncio.run(self._validate_sources(sources, criteria))
+        self._parse_pool = None
+        self._save_cache()
+        
+        for result in validation_results:
+            # Print result
+            status = "✅ PASS" if result.is_valid else "❌ FAIL"
+            review = " 🔍 REVIEW" if result.needs_manual_review else ""
+            print(f"  {status} {result.chunk_id} (Score: {result.score:.2f}){review}")
+            
+            if result.issues:
+                for issue in result.issues:
+                    print(f"    ⚠️ {issue}")
         
         # Generate validation report
         self._generate_validation_report(validation_results, output_report)
@@ -224,46 +480,51 @@ Provide validation in this JSON format:
     
     def _generate_validation_report(self, results: List[ValidationResult], output_file: str):
         """Generate comprehensive validation report"""
-        report = {
-            "validation_summary": {
-                "total_chunks": len(results),
-                "passed": len([r for r in results if r.is_valid]),
-                "failed": len([r for r in results if not r.is_valid]),
-                "manual_review_needed": len([r for r in results if r.needs_manual_review]),
-                "average_score": sum(r.score for r in results) / len(results) if results else 0
-            },
-            "validation_details": [
-                {
-                    "chunk_id": r.chunk_id,
-                    "is_valid": r.is_valid,
-                    "score": r.score,
-                    "issues": r.issues,
-                    "recommendations": r.recommendations,
-                    "needs_manual_review": r.needs_manual_review
-                }
-                for r in results
-            ],
-            "failed_chunks": [
-                {
-                    "chunk_id": r.chunk_id,
-                    "score": r.score,
-                    "issues": r.issues,
-                    "recommendations": r.recommendations
-                }
-                for r in results if not r.is_valid
-            ],
-            "manual_review_chunks": [
-                {
-                    "chunk_id": r.chunk_id,
-                    "score": r.score,
-                    "reasons": r.issues + r.recommendations
-                }
-                for r in results if r.needs_manual_review
-            ]
+        # Summary counts first; the row lists are then streamed out one row at a time
+        passed = 0
+        review = 0
+        score_sum = 0.0
+        for r in results:
+            score_sum += r.score
+            if r.is_valid:
+                passed += 1
+            if r.needs_manual_review:
+                review += 1
+        
+        summary = {
+            "total_chunks": len(results),
+            "passed": passed,
+            "failed": len(results) - passed,
+            "manual_review_needed": review,
+            "average_score": score_sum / len(results) if results else 0
         }
         
-        with open(output_file, 'w') as f:
-            json.dump(report, f, indent=2)
+        with open(output_file, 'wb', buffering=1 << 20) as f:
+            f.write(b'{\n  "validation_summary": ')
+            f.write(dump_json(summary).replace(b"\n", b"\n  "))
+            f.write(b',\n  "validation_details": ')
+            _write_rows(f, ({
+                "chunk_id": r.chunk_id,
+                "is_valid": r.is_valid,
+                "score": r.score,
+                "issues": r.issues,
+                "recommendations": r.recommendations,
+                "needs_manual_review": r.needs_manual_review
+            } for r in results))
+            f.write(b',\n  "failed_chunks": ')
+            _write_rows(f, ({
+                "chunk_id": r.chunk_id,
+                "score": r.score,
+                "issues": r.issues,
+                "recommendations": r.recommendations
+            } for r in results if not r.is_valid))
+            f.write(b',\n  "manual_review_chunks": ')
+            _write_rows(f, ({
+                "chunk_id": r.chunk_id,
+                "score": r.score,
+                "reasons": r.issues + r.recommendations
+            } for r in results if r.needs_manual_review))
+            f.write(b"\n}")
             
         print(f"📊 Validation report saved to: {output_file}")
     
@@ -303,6 +564,12 @@ def main():
                        help="Enable comment preservation validation")
     parser.add_argument("--strict-validation", action="store_true",
                        help="Enable strict validation criteria")
+    parser.add_argument("--max-concurrent", type=int, default=8,
+                       help="Maximum number of validation calls in flight")
+    parser.add_argument("--cache-file",
+                       help="Cache of results for unchanged chunks (default: <converted-chunks-dir>/.validation_cache.json)")
+    parser.add_argument("--no-cache", action="store_true",
+                       help="Validate every chunk, ignoring and not updating the cache")
     
     args = parser.parse_args()
     
@@ -317,7 +584,8 @@ def main():
     )
     
     # Create validator
-    validator = AIChunkValidator(args.model)
+    cache_file = None if args.no_cache else (args.cache_file or os.path.join(args.converted_chunks_dir, ".validation_cache.json"))
+    validator = AIChunkValidator(args.model, args.max_concurrent, cache_file)
     
     print(f"🔍 Starting AI chunk validation with {args.model}")
     print(f"📁 Converted chunks: {args.converted_chunks_dir}")
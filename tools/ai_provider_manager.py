@@ -5,11 +5,12 @@ Supports multiple AI providers (MCP, OpenAI, Anthropic, Ollama, LMStudio) with c
 """
 import json
 import os
+import re
 import asyncio
 import aiohttp
 import logging
 from typing import Dict, List, Optional, Union, Any
-from dataclasses import dataclass
+from dataclasses import dataclass, replace
 from enum import Enum
 import time
 
@@ -29,7 +30,16 @@ class TaskType(Enum):
     VALIDATION = "validation"
     ASSEMBLY = "assembly"
 
-@dataclass
+# Provider priority per selection strategy
+_COST_ORDER = ("mcp", "ollama", "lmstudio", "openai", "anthropic")      # MCP (free) > Ollama (local) > others
+_QUALITY_ORDER = ("anthropic", "openai", "mcp", "ollama", "lmstudio")   # Anthropic > OpenAI > MCP > others
+_SPEED_ORDER = ("ollama", "lmstudio", "mcp", "openai", "anthropic")     # Local models > Cloud APIs
+_BALANCED_ORDER = ("mcp", "openai", "anthropic", "ollama")
+
+# Providers that need an API key from the environment
+_CLOUD_PROVIDERS = frozenset(("openai", "anthropic", "azure_openai", "google"))
+
+@dataclass(frozen=True, slots=True)
 class AIRequest:
     """AI request with context"""
     task_type: TaskType
@@ -38,7 +48,7 @@ class AIRequest:
     max_tokens: int = 4000
     temperature: float = 0.1
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class AIResponse:
     """AI response with metadata"""
     content: str
@@ -51,11 +61,160 @@ class AIResponse:
     success: bool = True
     error: Optional[str] = None
 
+class BatchCoalescer:
+    """Combines requests that arrive close together into one provider call"""
+    
+    DELIMITER = "\n\n===REQ {}===\n"
+    # Each sub-prompt asks for bare output, so the reply format for the whole call is spelled out first
+    INSTRUCTIONS = (
+        "The {n} requests below are independent. Answer each one separately, in order.\n"
+        "Begin each answer with its header line exactly as given (===REQ 0===, ===REQ 1===, ...) "
+        "on a line of its own, then that answer only. Write nothing before the first header.\n"
+        "Output instructions inside a request apply to that request's answer only.\n"
+    )
+    
+    def __init__(self, manager: "AIProviderManager", max_wait_ms: int = 20, max_tokens: int = 60_000,
+                 max_requests: int = 0):
+        self.manager = manager
+        self.max_wait = max_wait_ms / 1000
+        self.max_tokens = max_tokens
+        self.max_requests = max_requests  # 0 means no limit per call
+        self.queue: asyncio.Queue = asyncio.Queue()
+        self._task: Optional[asyncio.Task] = None
+        self._dispatches: set = set()
+        # Groups whose combined reply could not be split are sent one request per call from then on
+        self._split_failed: set = set()
+    
+    async def submit(self, request: AIRequest, target: Optional[tuple[str, str]] = None) -> AIResponse:
+        """Queue a request and wait for its share of the combined response"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._coalescer_loop())
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((request, future, target))
+        return await future
+    
+    async def close(self):
+        """Stop collecting; requests already dispatched still complete"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._dispatches:
+            await asyncio.gather(*self._dispatches)
+    
+    async def _coalescer_loop(self):
+        """Collect requests for up to max_wait after the first, grouped by task type"""
+        loop = asyncio.get_running_loop()
+        while True:
+            groups: Dict[tuple, list] = {}
+            tokens: Dict[tuple, int] = {}
+            item = await self.queue.get()
+            deadline = loop.time() + self.max_wait
+            while True:
+                request, future, target = item
+                item = (request, future)
+                # Temperature and provider are per call, so only requests that share them can be combined
+                key = (request.task_type, request.temperature, target)
+                if key in self._split_failed:
+                    self._dispatch(key, [item])
+                else:
+                    cost = _estimate_tokens(request)
+                    if key in groups and tokens[key] + cost > self.max_tokens:
+                        self._dispatch(key, groups.pop(key))
+                        del tokens[key]
+                    group = groups.setdefault(key, [])
+                    group.append(item)
+                    tokens[key] = tokens.get(key, 0) + cost
+                    if self.max_requests and len(group) >= self.max_requests:
+                        self._dispatch(key, groups.pop(key))
+                        del tokens[key]
+                
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self.queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+            for key, group in groups.items():
+                self._dispatch(key, group)
+    
+    def _dispatch(self, key: tuple, group: list):
+        task = asyncio.create_task(self._run_group(key, group))
+        self._dispatches.add(task)
+        task.add_done_callback(self._dispatches.discard)
+    
+    async def _run_group(self, key: tuple, group: list):
+        try:
+            if len(group) == 1:
+                request, future = group[0]
+                responses = [await self.manager.make_ai_request(request, key[2])]
+            else:
+                responses = await self._run_combined(key, [request for request, _ in group])
+            for (_, future), response in zip(group, responses):
+                if not future.done():
+                    future.set_result(response)
+        except Exception as e:
+            for _, future in group:
+                if not future.done():
+                    future.set_exception(e)
+    
+    async def _run_combined(self, key: tuple, requests: List[AIRequest]) -> List[AIResponse]:
+        """One call for all requests; falls back to separate calls if the reply cannot be split"""
+        first = requests[0]
+        n = len(requests)
+        combined = AIRequest(
+            task_type=first.task_type,
+            prompt=self.INSTRUCTIONS.format(n=n) + "".join(self.DELIMITER.format(i) + r.prompt
+                                                         for i, r in enumerate(requests)),
+            context={"batched_requests": [r.context for r in requests]},
+            max_tokens=sum(r.max_tokens for r in requests),
+            temperature=first.temperature
+        )
+        target = key[2]
+        response = await self.manager.make_ai_request(combined, target)
+        
+        parts = _split_combined(response.content, n) if response.success else None
+        if parts is None:
+            if response.success:
+                # The provider ignores the reply format; stop paying for combined calls it cannot answer
+                self._split_failed.add(key)
+                self.manager.logger.warning("Combined reply for %d %s requests could not be split; "
+                                            "sending them separately from now on", n, first.task_type.value)
+            return list(await asyncio.gather(*(self.manager.make_ai_request(r, target) for r in requests)))
+        
+        return [
+            replace(response, content=part, tokens_used=response.tokens_used // n, cost=response.cost / n)
+            for part in parts
+        ]
+
+def _estimate_tokens(request: AIRequest) -> int:
+    # Rough prompt size; about four characters per token
+    return len(request.prompt) // 4
+
+# "===REQ i===" header lines as requested by BatchCoalescer.INSTRUCTIONS
+_REQ_DELIMITER_RE = re.compile(r"^[^\S\n]*===REQ (\d+)===[^\S\n]*(?:\n|\Z)", re.MULTILINE)
+
+def _split_combined(content: str, n: int) -> Optional[List[str]]:
+    """Split a combined reply into n parts by its ===REQ i=== headers, or None if they don't match"""
+    pieces = _REQ_DELIMITER_RE.split(content)
+    # pieces = [preamble, "0", part0, "1", part1, ...]; any preamble before the first header is dropped
+    indices = pieces[1::2]
+    if indices != [str(i) for i in range(n)]:
+        return None
+    return [part.strip() for part in pieces[2::2]]
+
 class AIProviderManager:
     """Manages multiple AI providers with configurable models"""
     
-    def __init__(self, config_file: str = "ai_conversion_config.json"):
+    def __init__(self, config_file: str = "ai_conversion_config.json", max_batch_requests: int = 0):
         self.config = self._load_config(config_file)
+        self.max_batch_requests = max_batch_requests
+        self._models_by_task = self._index_models(self.config)
+        self._env_cache = self._snapshot_env()
         self.session: Optional[aiohttp.ClientSession] = None
         self.logger = self._setup_logging()
         self.stats = {
@@ -65,6 +224,11 @@ class AIProviderManager:
             "total_cost": 0.0,
             "total_tokens": 0
         }
+        self._overrides: Dict[TaskType, tuple[str, str]] = {}
+        # Selection only depends on config and environment, so resolve once per (mode, task)
+        self._resolved: Dict[tuple[str, TaskType], tuple[str, str]] = {}
+        self._available: Dict[str, bool] = {}
+        self._coalescer: Optional[BatchCoalescer] = None
         
     def _load_config(self, config_file: str) -> Dict:
         """Load AI provider configuration"""
@@ -76,6 +240,26 @@ class AIProviderManager:
         except json.JSONDecodeError as e:
             raise ValueError(f"Invalid JSON in configuration file: {e}")
     
+    def _index_models(self, config: Dict) -> Dict[str, Dict[TaskType, str]]:
+        """Map each provider's models by TaskType so selection skips the .value lookup"""
+        task_types = {t.value: t for t in TaskType}
+        return {
+            name: {task_types[k]: v for k, v in provider["models"].items() if k in task_types}
+            for name, provider in config["providers"].items()
+            if "models" in provider
+        }
+    
+    def _snapshot_env(self) -> Dict[str, Optional[str]]:
+        """Read every provider API key variable once"""
+        keys = {provider["api_key_env"] for provider in self.config["providers"].values()
+                if provider.get("api_key_env")}
+        return {key: os.environ.get(key) for key in keys}
+    
+    def refresh_env(self):
+        """Re-read API key variables, e.g. after a test changed os.environ"""
+        self._env_cache = self._snapshot_env()
+        self._clear_selection_cache()
+    
     def _setup_logging(self) -> logging.Logger:
         """Setup logging based on configuration"""
         logger = logging.getLogger("ai_provider_manager")
@@ -94,64 +278,71 @@ class AIProviderManager:
     
     async def __aenter__(self):
         """Async context manager entry"""
-        self.session = aiohttp.ClientSession()
+        # One pooled session for every provider call, so TLS handshakes and DNS
+        # lookups are paid once per host rather than per request
+        connector = aiohttp.TCPConnector(limit=128, limit_per_host=32,
+                                         keepalive_timeout=60, ttl_dns_cache=300)
+        self.session = aiohttp.ClientSession(
+            connector=connector,
+            timeout=aiohttp.ClientTimeout(total=60, sock_connect=5)
+        )
         return self
     
     async def __aexit__(self, exc_type, exc_val, exc_tb):
         """Async context manager exit"""
+        if self._coalescer is not None:
+            await self._coalescer.close()
+            self._coalescer = None
         if self.session:
             await self.session.close()
     
     def get_optimal_provider_and_model(self, task_type: TaskType) -> tuple[str, str]:
         """Get optimal provider and model for task type based on strategy"""
+        override = self._overrides.get(task_type)
+        if override is not None:
+            return override
+        
         strategy = self.config["conversion_strategy"]["model_selection_strategy"]
         mode = strategy["mode"]
         
+        key = (mode, task_type)
+        resolved = self._resolved.get(key)
+        if resolved is not None:
+            return resolved
+        
         if mode == "cost_optimized":
-            return self._get_cost_optimized_provider(task_type)
+            resolved = self._get_cost_optimized_provider(task_type)
         elif mode == "quality_first":
-            return self._get_quality_first_provider(task_type)
+            resolved = self._get_quality_first_provider(task_type)
         elif mode == "speed_first":
-            return self._get_speed_first_provider(task_type)
+            resolved = self._get_speed_first_provider(task_type)
         else:  # balanced
-            return self._get_balanced_provider(task_type)
+            resolved = self._get_balanced_provider(task_type)
+        
+        self._resolved[key] = resolved
+        return resolved
     
     def _get_cost_optimized_provider(self, task_type: TaskType) -> tuple[str, str]:
         """Get cheapest available provider for task"""
-        # Priority: MCP (free) > Ollama (local) > others
-        providers_by_cost = ["mcp", "ollama", "lmstudio", "openai", "anthropic"]
-        
-        for provider_name in providers_by_cost:
+        for provider_name in _COST_ORDER:
             if self._is_provider_available(provider_name):
-                provider_config = self.config["providers"][provider_name]
-                model = provider_config["models"][task_type.value]
-                return provider_name, model
+                return provider_name, self._models_by_task[provider_name][task_type]
         
         raise RuntimeError("No available providers found")
     
     def _get_quality_first_provider(self, task_type: TaskType) -> tuple[str, str]:
         """Get highest quality provider for task"""
-        # Priority: Anthropic > OpenAI > MCP > others
-        providers_by_quality = ["anthropic", "openai", "mcp", "ollama", "lmstudio"]
-        
-        for provider_name in providers_by_quality:
+        for provider_name in _QUALITY_ORDER:
             if self._is_provider_available(provider_name):
-                provider_config = self.config["providers"][provider_name]
-                model = provider_config["models"][task_type.value]
-                return provider_name, model
+                return provider_name, self._models_by_task[provider_name][task_type]
         
         raise RuntimeError("No available providers found")
     
     def _get_speed_first_provider(self, task_type: TaskType) -> tuple[str, str]:
         """Get fastest provider for task"""
-        # Priority: Local models > Cloud APIs
-        providers_by_speed = ["ollama", "lmstudio", "mcp", "openai", "anthropic"]
-        
-        for provider_name in providers_by_speed:
+        for provider_name in _SPEED_ORDER:
             if self._is_provider_available(provider_name):
-                provider_config = self.config["providers"][provider_name]
-                model = provider_config["models"][task_type.value]
-                return provider_name, model
+                return provider_name, self._models_by_task[provider_name][task_type]
         
         raise RuntimeError("No available providers found")
     
@@ -167,18 +358,21 @@ class AIProviderManager:
     
     def _get_balanced_provider_internal(self, task_type: TaskType) -> tuple[str, str]:
         """Internal balanced provider selection"""
-        providers_balanced = ["mcp", "openai", "anthropic", "ollama"]
-        
-        for provider_name in providers_balanced:
+        for provider_name in _BALANCED_ORDER:
             if self._is_provider_available(provider_name):
-                provider_config = self.config["providers"][provider_name]
-                model = provider_config["models"][task_type.value]
-                return provider_name, model
+                return provider_name, self._models_by_task[provider_name][task_type]
         
         raise RuntimeError("No available providers found")
     
     def _is_provider_available(self, provider_name: str) -> bool:
         """Check if provider is available and enabled"""
+        available = self._available.get(provider_name)
+        if available is None:
+            available = self._available[provider_name] = self._check_provider_available(provider_name)
+        return available
+    
+    def _check_provider_available(self, provider_name: str) -> bool:
+        """Uncached availability check behind _is_provider_available"""
         if provider_name not in self.config["providers"]:
             return False
         
@@ -187,21 +381,27 @@ class AIProviderManager:
             return False
         
         # Check API key for cloud providers
-        if provider_name in ["openai", "anthropic", "azure_openai", "google"]:
+        if provider_name in _CLOUD_PROVIDERS:
             api_key_env = provider_config.get("api_key_env")
-            if not api_key_env or not os.getenv(api_key_env):
-                self.logger.warning(f"API key not found for {provider_name}")
+            if not api_key_env or not self._env_cache.get(api_key_env):
+                self.logger.warning("API key not found for %s", provider_name)
                 return False
         
         return True
     
-    async def make_ai_request(self, request: AIRequest) -> AIResponse:
-        """Make AI request using optimal provider"""
+    async def submit(self, request: AIRequest, target: Optional[tuple[str, str]] = None) -> AIResponse:
+        """Like make_ai_request, but may share one provider call with concurrent requests"""
+        if self._coalescer is None:
+            self._coalescer = BatchCoalescer(self, max_requests=self.max_batch_requests)
+        return await self._coalescer.submit(request, target)
+    
+    async def make_ai_request(self, request: AIRequest, target: Optional[tuple[str, str]] = None) -> AIResponse:
+        """Make AI request using optimal provider, or the (provider, model) target if given"""
         start_time = time.time()
         
         try:
-            provider_name, model = self.get_optimal_provider_and_model(request.task_type)
-            self.logger.info(f"Using provider: {provider_name}, model: {model} for {request.task_type.value}")
+            provider_name, model = target or self.get_optimal_provider_and_model(request.task_type)
+            self.logger.info("Using provider: %s, model: %s for %s", provider_name, model, request.task_type.value)
             
             # Route to appropriate provider
             if provider_name == "mcp":
@@ -217,10 +417,13 @@ class AIProviderManager:
             else:
                 raise ValueError(f"Unsupported provider: {provider_name}")
             
-            response.response_time = time.time() - start_time
-            response.provider = provider_name
-            response.model = model
-            response.task_type = request.task_type
+            response = replace(
+                response,
+                response_time=time.time() - start_time,
+                provider=provider_name,
+                model=model,
+                task_type=request.task_type
+            )
             
             # Update stats
             self.stats["requests"] += 1
@@ -234,7 +437,7 @@ class AIProviderManager:
             return response
             
         except Exception as e:
-            self.logger.error(f"AI request failed: {e}")
+            self.logger.error("AI request failed: %s", e)
             return AIResponse(
                 content="",
                 provider="unknown",
@@ -255,7 +458,7 @@ class AIProviderManager:
             model = "auto"
         
         # Mock MCP call - in real implementation, call MCP server
-        self.logger.info(f"Calling MCP server with model: {model}")
+        self.logger.info("Calling MCP server with model: %s", model)
         await asyncio.sleep(0.1)  # Simulate API call
         
         return AIResponse(
@@ -271,7 +474,7 @@ class AIProviderManager:
     async def _call_openai_provider(self, request: AIRequest, model: str) -> AIResponse:
         """Call OpenAI API"""
         openai_config = self.config["providers"]["openai"]
-        api_key = os.getenv(openai_config["api_key_env"])
+        api_key = self._env_cache.get(openai_config["api_key_env"])
         
         headers = {
             "Authorization": f"Bearer {api_key}",
@@ -286,7 +489,7 @@ class AIProviderManager:
         }
         
         # Mock OpenAI call - in real implementation, call OpenAI API
-        self.logger.info(f"Calling OpenAI API with model: {model}")
+        self.logger.info("Calling OpenAI API with model: %s", model)
         await asyncio.sleep(0.2)  # Simulate API call
         
         return AIResponse(
@@ -302,10 +505,10 @@ class AIProviderManager:
     async def _call_anthropic_provider(self, request: AIRequest, model: str) -> AIResponse:
         """Call Anthropic API"""
         anthropic_config = self.config["providers"]["anthropic"]
-        api_key = os.getenv(anthropic_config["api_key_env"])
+        api_key = self._env_cache.get(anthropic_config["api_key_env"])
         
         # Mock Anthropic call - in real implementation, call Anthropic API
-        self.logger.info(f"Calling Anthropic API with model: {model}")
+        self.logger.info("Calling Anthropic API with model: %s", model)
         await asyncio.sleep(0.3)  # Simulate API call
         
         return AIResponse(
@@ -324,7 +527,7 @@ class AIProviderManager:
         base_url = ollama_config["base_url"]
         
         # Mock Ollama call - in real implementation, call Ollama API
-        self.logger.info(f"Calling Ollama with model: {model}")
+        self.logger.info("Calling Ollama with model: %s", model)
         await asyncio.sleep(0.5)  # Simulate local processing
         
         return AIResponse(
@@ -343,7 +546,7 @@ class AIProviderManager:
         base_url = lmstudio_config["base_url"]
         
         # Mock LM Studio call - in real implementation, call LM Studio API
-        self.logger.info(f"Calling LM Studio with model: {model}")
+        self.logger.info("Calling LM Studio with model: %s", model)
         await asyncio.sleep(0.4)  # Simulate local processing
         
         return AIResponse(
@@ -372,14 +575,18 @@ class AIProviderManager:
     
     def set_provider_override(self, task_type: TaskType, provider: str, model: str):
         """Override provider for specific task type"""
-        if not hasattr(self, '_overrides'):
-            self._overrides = {}
         self._overrides[task_type] = (provider, model)
+        self._clear_selection_cache()
     
     def clear_provider_overrides(self):
         """Clear all provider overrides"""
-        if hasattr(self, '_overrides'):
-            delattr(self, '_overrides')
+        self._overrides.clear()
+        self._clear_selection_cache()
+    
+    def _clear_selection_cache(self):
+        """Forget resolved providers, e.g. after the config or environment changed"""
+        self._resolved.clear()
+        self._available.clear()
 
 # Example usage and testing
 async def demo_provider_manager():
@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""
+Helpers shared by the chunk conversion tools: file and JSON I/O, comment scanning
+"""
+import os
+import re
+import json
+
+try:
+    import orjson  # optional, several times faster than json for manifests, reports and replies
+except ImportError:
+    orjson = None
+
+# Lines that start with a comment, captured without surrounding whitespace
+COMMENT_RE = re.compile(r'^[^\S\n]*((?://|/\*).*?)[^\S\n]*$', re.MULTILINE)
+LINE_COMMENT_RE = re.compile(r'^[^\S\n]*//', re.MULTILINE)
+
+def read_text(path: str) -> str:
+    # One raw read and one decode; newlines are translated as in text mode
+    with open(path, 'rb') as f:
+        text = f.read().decode('utf-8')
+    if '\r' in text:
+        text = text.replace('\r\n', '\n').replace('\r', '\n')
+    return text
+
+def write_bytes(path: str, data: bytes):
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+    try:
+        view = memoryview(data)
+        while view:
+            view = view[os.write(fd, view):]
+    finally:
+        os.close(fd)
+
+def write_bytes_atomic(path: str, data: bytes):
+    # Written to a temp file first, so an interrupted run never leaves path truncated
+    tmp_path = path + '.tmp'
+    write_bytes(tmp_path, data)
+    os.replace(tmp_path, path)
+
+def loads(data):
+    # orjson.JSONDecodeError subclasses json.JSONDecodeError, so callers catch either
+    return orjson.loads(data) if orjson is not None else json.loads(data)
+
+def dump_json(obj) -> bytes:
+    """Indented JSON as bytes; orjson when installed, stdlib json otherwise"""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2)
+    return json.dumps(obj, indent=2, ensure_ascii=False).encode('utf-8')
+
+def dump_json_compact(obj) -> bytes:
+    """Unindented JSON as bytes, for caches nobody reads by hand"""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, ensure_ascii=False).encode('utf-8')
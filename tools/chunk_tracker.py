@@ -3,12 +3,18 @@
 Chunk Conversion Tracker
 Tracks conversion progress and ensures no chunks are missed
 """
-import json
 import os
+import re
 from typing import Dict, List, Set
 from dataclasses import dataclass
+from chunk_common import dump_json, loads, write_bytes_atomic
 
-@dataclass
+_FUN_NAME_RE = re.compile(r'\bfun\s+(\w+)\s*\(')
+_STRUCTURAL_KINDS = frozenset(('function', 'class'))
+# ConversionStatus fields written per chunk by export_tracking_status, in output order
+_EXPORT_FIELDS = ('kind', 'name', 'tree_path', 'converted', 'in_skeleton', 'in_final_kotlin', 'conversion_notes')
+
+@dataclass(slots=True)
 class ConversionStatus:
     chunk_id: str
     kind: str
@@ -29,38 +35,44 @@ class ChunkTracker:
     
     def load_manifest(self):
         """Load chunk manifest"""
-        with open(self.manifest_file, 'r', encoding='utf-8') as f:
-            self.manifest = json.load(f)
+        with open(self.manifest_file, 'rb') as f:
+            data = f.read()
+        self.manifest = loads(data)
         print(f"Loaded manifest with {self.manifest['total_chunks']} chunks")
     
     def initialize_tracking(self):
         """Initialize conversion tracking for all chunks"""
-        for chunk_id, chunk_info in self.manifest['chunks'].items():
-            self.conversion_status[chunk_id] = ConversionStatus(
+        self.conversion_status = {
+            chunk_id: ConversionStatus(
                 chunk_id=chunk_id,
                 kind=chunk_info['kind'],
                 name=chunk_info['name'],
                 tree_path=chunk_info['tree_path']
             )
+            for chunk_id, chunk_info in self.manifest['chunks'].items()
+        }
     
     def mark_converted(self, chunk_id: str, notes: str = ""):
         """Mark a chunk as converted"""
-        if chunk_id in self.conversion_status:
-            self.conversion_status[chunk_id].converted = True
-            self.conversion_status[chunk_id].conversion_notes = notes
+        status = self.conversion_status.get(chunk_id)
+        if status is not None:
+            status.converted = True
+            status.conversion_notes = notes
             print(f"✅ Marked {chunk_id} as converted")
         else:
             print(f"❌ Unknown chunk_id: {chunk_id}")
     
     def mark_in_skeleton(self, chunk_id: str):
         """Mark a chunk as included in skeleton"""
-        if chunk_id in self.conversion_status:
-            self.conversion_status[chunk_id].in_skeleton = True
+        status = self.conversion_status.get(chunk_id)
+        if status is not None:
+            status.in_skeleton = True
     
     def mark_in_final(self, chunk_id: str):
         """Mark a chunk as included in final Kotlin file"""
-        if chunk_id in self.conversion_status:
-            self.conversion_status[chunk_id].in_final_kotlin = True
+        status = self.conversion_status.get(chunk_id)
+        if status is not None:
+            status.in_final_kotlin = True
     
     def get_unconverted_chunks(self) -> List[ConversionStatus]:
         """Get list of chunks not yet converted"""
@@ -75,17 +87,18 @@ class ChunkTracker:
     def get_missing_from_skeleton(self) -> List[ConversionStatus]:
         """Get chunks missing from skeleton"""
         return [status for status in self.conversion_status.values() 
-                if not status.in_skeleton and status.kind in ['function', 'class']]
+                if not status.in_skeleton and status.kind in _STRUCTURAL_KINDS]
     
     def get_missing_from_final(self) -> List[ConversionStatus]:
         """Get chunks missing from final Kotlin"""
         return [status for status in self.conversion_status.values() 
-                if not status.in_final_kotlin and status.kind in ['function', 'class']]
+                if not status.in_final_kotlin and status.kind in _STRUCTURAL_KINDS]
     
     def verify_kotlin_file_coverage(self, kotlin_file: str):
         """Verify that Kotlin file contains all expected chunks"""
         with open(kotlin_file, 'r', encoding='utf-8') as f:
             kotlin_content = f.read()
+        found = set(_FUN_NAME_RE.findall(kotlin_content))
         
         # Check function coverage
         function_chunks = self.get_function_chunks()
@@ -94,31 +107,48 @@ class ChunkTracker:
         for func_status in function_chunks:
             # Convert C++ function name to expected Kotlin name
             cpp_name = func_status.name
-            if '::' in cpp_name:
-                kotlin_name = cpp_name.split('::')[1]  # Remove CTest:: prefix
-                
-                # Convert to camelCase (first letter lowercase)
-                if kotlin_name:
-                    kotlin_name = kotlin_name[0].lower() + kotlin_name[1:]
-                
-                # Check if function exists in Kotlin file
-                if f"fun {kotlin_name}(" in kotlin_content:
-                    self.mark_in_final(func_status.chunk_id)
-                    print(f"✅ Found {kotlin_name} in Kotlin file")
-                else:
-                    missing_functions.append(func_status)
-                    print(f"❌ Missing {kotlin_name} from Kotlin file")
+            if '::' not in cpp_name:
+                continue
+            # Segment after the first '::' (removes the CTest:: prefix)
+            kotlin_name = cpp_name.partition('::')[2].partition('::')[0]
+            
+            # Convert to camelCase (first letter lowercase)
+            if kotlin_name:
+                kotlin_name = kotlin_name[0].lower() + kotlin_name[1:]
+            
+            # Check if function exists in Kotlin file
+            if kotlin_name in found:
+                func_status.in_final_kotlin = True
+                print(f"✅ Found {kotlin_name} in Kotlin file")
+            else:
+                missing_functions.append(func_status)
+                print(f"❌ Missing {kotlin_name} from Kotlin file")
         
         return missing_functions
     
     def generate_coverage_report(self) -> str:
         """Generate detailed coverage report"""
         total_chunks = len(self.conversion_status)
-        converted_chunks = len([s for s in self.conversion_status.values() if s.converted])
-        function_chunks = self.get_function_chunks()
-        unconverted_functions = [f for f in function_chunks if not f.converted]
+        converted_chunks = 0
+        function_chunks = []
+        unconverted_functions = []
+        missing_from_skeleton = 0
+        missing_from_final = 0
+        # Single pass over all statuses for every count the report needs
+        for status in self.conversion_status.values():
+            if status.converted:
+                converted_chunks += 1
+            if status.kind == 'function':
+                function_chunks.append(status)
+                if not status.converted:
+                    unconverted_functions.append(status)
+            if status.kind in _STRUCTURAL_KINDS:
+                if not status.in_skeleton:
+                    missing_from_skeleton += 1
+                if not status.in_final_kotlin:
+                    missing_from_final += 1
         
-        report = f"""
+        parts = [f"""
 === CHUNK CONVERSION COVERAGE REPORT ===
 
 Overall Coverage:
@@ -132,44 +162,34 @@ Function Coverage:
   Unconverted functions: {len(unconverted_functions)}
 
 Unconverted Functions:
-"""
+"""]
         for func in unconverted_functions:
-            report += f"  - {func.name} ({func.chunk_id})\n"
+            parts.append(f"  - {func.name} ({func.chunk_id})\n")
         
-        report += f"""
-Missing from Skeleton: {len(self.get_missing_from_skeleton())}
-Missing from Final: {len(self.get_missing_from_final())}
+        parts.append(f"""
+Missing from Skeleton: {missing_from_skeleton}
+Missing from Final: {missing_from_final}
 
 Function Names in Tree Order:
-"""
+""")
         for func in function_chunks:
-            status = "✅" if func.converted else "❌"
-            report += f"  {status} {func.name} (path: {func.tree_path})\n"
+            parts.append(f"  {'✅' if func.converted else '❌'} {func.name} (path: {func.tree_path})\n")
         
-        return report
+        return "".join(parts)
     
     def export_tracking_status(self, output_file: str):
         """Export current tracking status"""
         status_data = {
             'manifest_file': self.manifest_file,
             'total_chunks': len(self.conversion_status),
-            'converted_count': len([s for s in self.conversion_status.values() if s.converted]),
+            'converted_count': sum(1 for s in self.conversion_status.values() if s.converted),
             'chunks': {
-                cid: {
-                    'kind': status.kind,
-                    'name': status.name,
-                    'tree_path': status.tree_path,
-                    'converted': status.converted,
-                    'in_skeleton': status.in_skeleton,
-                    'in_final_kotlin': status.in_final_kotlin,
-                    'conversion_notes': status.conversion_notes
-                }
+                cid: {field: getattr(status, field) for field in _EXPORT_FIELDS}
                 for cid, status in self.conversion_status.items()
             }
         }
         
-        with open(output_file, 'w', encoding='utf-8') as f:
-            json.dump(status_data, f, indent=2, ensure_ascii=False)
+        write_bytes_atomic(output_file, dump_json(status_data))
         
         print(f"Tracking status exported to: {output_file}")
 
@@ -4,12 +4,52 @@ Enhanced AI Chunk Converter with Configurable Providers
 Supports MCP, OpenAI, Anthropic, Ollama, LMStudio with intelligent provider selection
 """
 import os
-import json
+import hashlib
+import logging
 import argparse
 import asyncio
-from typing import Dict, List, Optional, Tuple
+from typing import Dict, List, Optional, Set, Tuple
 from dataclasses import dataclass
 from ai_provider_manager import AIProviderManager, AIRequest, TaskType
+from chunk_common import COMMENT_RE, LINE_COMMENT_RE, dump_json, dump_json_compact, loads, write_bytes, write_bytes_atomic
+
+logger = logging.getLogger("enhanced-ai-chunk-converter")
+
+_FAILURE_MARKERS = ("CONVERSION_FAILED", "ERROR:", "PLACEHOLDER")
+
+# Static parts of the conversion prompt, joined around the chunk details
+_CONVERSION_PROMPT_HEAD = """
+Convert this C++ code chunk to idiomatic Kotlin, following these requirements:
+
+**CRITICAL RULES:**
+1. PRESERVE ALL COMMENTS EXACTLY (including Japanese text)
+2. Maintain business logic and algorithms precisely
+3. Use proper Kotlin syntax and conventions
+4. Handle null safety appropriately
+5. Convert C++ patterns to Kotlin equivalents
+
+**Chunk Information:**
+- Chunk ID: """
+_CONVERSION_PROMPT_TAIL = """
+```
+
+**Conversion Guidelines:**
+- char arrays → String or CharArray as appropriate
+- Pointers → nullable types or direct references
+- C-style casts → Kotlin type conversion
+- strcpy/strcat → Kotlin string operations
+- Manual memory management → Kotlin automatic memory management
+- C++ member access (->) → Kotlin property access (.)
+
+**Output Format:**
+Provide ONLY the converted Kotlin code with preserved comments.
+Do not include explanations or markdown formatting.
+"""
+
+def _load_chunk(path: str) -> Dict:
+    with open(path, 'rb') as f:
+        data = f.read()
+    return loads(data)
 
 @dataclass
 class EnhancedChunkContext:
@@ -26,21 +66,29 @@ class EnhancedChunkContext:
 class EnhancedAIChunkConverter:
     """Enhanced AI chunk converter with multiple provider support"""
     
-    def __init__(self, config_file: str = "ai_conversion_config.json"):
+    def __init__(self, config_file: str = "ai_conversion_config.json", max_concurrent: int = 8,
+                 batch_size: int = 1, cache_file: Optional[str] = None):
         self.config_file = config_file
+        self.max_concurrent = max_concurrent
+        self.batch_size = batch_size
+        # Kotlin output of earlier successful conversions keyed by content hash (see _cache_key); None disables it
+        self.cache_file = cache_file
+        self._cache: Dict[str, str] = {}
         self.provider_manager = None
+        self._conversion_target: Optional[Tuple[str, str]] = None
         self.conversion_stats = {
             "total_chunks": 0,
             "successful_conversions": 0,
             "failed_conversions": 0,
             "manual_review_flagged": 0,
             "providers_used": {},
+            "cache_hits": 0,
             "total_cost": 0.0
         }
         
     async def __aenter__(self):
         """Async context manager entry"""
-        self.provider_manager = AIProviderManager(self.config_file)
+        self.provider_manager = AIProviderManager(self.config_file, max_batch_requests=self.batch_size)
         await self.provider_manager.__aenter__()
         return self
     
@@ -51,48 +99,26 @@ class EnhancedAIChunkConverter:
     
     def create_conversion_prompt(self, context: EnhancedChunkContext) -> str:
         """Create AI prompt for chunk conversion"""
-        prompt = f"""
-Convert this C++ code chunk to idiomatic Kotlin, following these requirements:
-
-**CRITICAL RULES:**
-1. PRESERVE ALL COMMENTS EXACTLY (including Japanese text)
-2. Maintain business logic and algorithms precisely
-3. Use proper Kotlin syntax and conventions
-4. Handle null safety appropriately
-5. Convert C++ patterns to Kotlin equivalents
-
-**Chunk Information:**
-- Chunk ID: {context.chunk_id}
-- Type: {context.chunk_type}
-- Tree Path: {context.tree_path}
-
-**Dependencies:** {', '.join(context.dependencies)}
-
-**Function Signature (if applicable):**
-{context.function_signature or 'N/A'}
-
-**C++ Code to Convert:**
-```cpp
-{context.cpp_code}
-```
-
-**Conversion Guidelines:**
-- char arrays → String or CharArray as appropriate
-- Pointers → nullable types or direct references
-- C-style casts → Kotlin type conversion
-- strcpy/strcat → Kotlin string operations
-- Manual memory management → Kotlin automatic memory management
-- C++ member access (->) → Kotlin property access (.)
-
-**Output Format:**
-Provide ONLY the converted Kotlin code with preserved comments.
-Do not include explanations or markdown formatting.
-"""
-        return prompt
+        # Only the chunk details are formatted per call; the static text is shared
+        return (f"{_CONVERSION_PROMPT_HEAD}{context.chunk_id}"
+                f"\n- Type: {context.chunk_type}"
+                f"\n- Tree Path: {context.tree_path}"
+                f"\n\n**Dependencies:** {', '.join(context.dependencies)}"
+                f"\n\n**Function Signature (if applicable):**\n{context.function_signature or 'N/A'}"
+                f"\n\n**C++ Code to Convert:**\n```cpp\n{context.cpp_code}{_CONVERSION_PROMPT_TAIL}")
     
     async def convert_chunk_with_ai(self, context: EnhancedChunkContext) -> Tuple[bool, str]:
         """Convert chunk using optimal AI provider"""
         try:
+            if self.cache_file is not None:
+                key = self._cache_key(context)
+                cached = self._cache.get(key)
+                if cached is not None:
+                    # Identical chunk converted before; skip the provider call
+                    self.conversion_stats["successful_conversions"] += 1
+                    self.conversion_stats["cache_hits"] += 1
+                    return True, cached
+            
             prompt = self.create_conversion_prompt(context)
             
             request = AIRequest(
@@ -105,13 +131,19 @@ Do not include explanations or markdown formatting.
                 }
             )
             
-            response = await self.provider_manager.make_ai_request(request)
+            if self.batch_size > 1:
+                # Chunks in flight together share one provider call, up to batch_size per call
+                response = await self.provider_manager.submit(request, self._conversion_target)
+            else:
+                response = await self.provider_manager.make_ai_request(request, self._conversion_target)
             
             if response.success:
                 # Validate conversion
                 if self._validate_conversion(context.cpp_code, response.content):
                     self.conversion_stats["successful_conversions"] += 1
                     self._update_provider_stats(response.provider, response.cost)
+                    if self.cache_file is not None:
+                        self._cache[key] = response.content
                     return True, response.content
                 else:
                     self.conversion_stats["failed_conversions"] += 1
@@ -127,22 +159,41 @@ Do not include explanations or markdown formatting.
     def _validate_conversion(self, cpp_code: str, kotlin_code: str) -> bool:
         """Validate AI conversion quality"""
         # Check for obvious errors
-        if any(marker in kotlin_code for marker in ["CONVERSION_FAILED", "ERROR:", "PLACEHOLDER"]):
-            return False
+        for marker in _FAILURE_MARKERS:
+            if marker in kotlin_code:
+                return False
             
-        # Check comment preservation
-        cpp_comment_lines = [line.strip() for line in cpp_code.split('\n') 
-                           if line.strip().startswith('//')]
-        kotlin_comment_lines = [line.strip() for line in kotlin_code.split('\n') 
-                              if line.strip().startswith('//')]
-        
-        # Should have similar number of comments
-        if len(cpp_comment_lines) > 0 and len(kotlin_comment_lines) == 0:
-            print(f"⚠️ Warning: Comments may have been lost in conversion")
+        # Check comment preservation: stop at the first '//' line on each side
+        if LINE_COMMENT_RE.search(cpp_code) and not LINE_COMMENT_RE.search(kotlin_code):
+            logger.warning("⚠️ Warning: Comments may have been lost in conversion")
             return False
             
         return True
     
+    def _cache_key(self, context: EnhancedChunkContext) -> str:
+        """Digest of every prompt field and the provider; only the chunk id is left out so duplicates share an entry"""
+        h = hashlib.blake2b(digest_size=20)
+        for part in (context.cpp_code, context.chunk_type, context.tree_path, '\0'.join(context.dependencies),
+                     str(context.function_signature), _CONVERSION_PROMPT_HEAD, _CONVERSION_PROMPT_TAIL,
+                     repr(self._conversion_target)):
+            data = part.encode('utf-8')
+            h.update(len(data).to_bytes(8, 'little'))
+            h.update(data)
+        return h.hexdigest()
+    
+    def _load_cache(self):
+        if self.cache_file is None:
+            return
+        try:
+            self._cache = _load_chunk(self.cache_file)
+        except (FileNotFoundError, ValueError):
+            self._cache = {}
+    
+    def _save_cache(self):
+        if self.cache_file is None:
+            return
+        write_bytes_atomic(self.cache_file, dump_json_compact(self._cache))
+    
     def _update_provider_stats(self, provider: str, cost: float):
         """Update provider usage statistics"""
         if provider not in self.conversion_stats["providers_used"]:
@@ -160,10 +211,14 @@ Do not include explanations or markdown formatting.
         os.makedirs(output_dir, exist_ok=True)
         
         # Load chunk manifest
-        with open(manifest_file, 'r') as f:
-            manifest = json.load(f)
+        manifest = await asyncio.to_thread(_load_chunk, manifest_file)
         
-        converted_chunks = {}
+        # One directory scan answers every "is this chunk on disk" check below
+        try:
+            with os.scandir(chunks_dir) as it:
+                chunk_files = [e.name for e in it if e.name.endswith('.json') and e.is_file()]
+        except FileNotFoundError:
+            chunk_files = []
         
         # Get chunk list from manifest
         chunk_list = []
@@ -173,69 +228,92 @@ Do not include explanations or markdown formatting.
             chunk_list = [chunk['chunk_id'] if isinstance(chunk, dict) else chunk 
                          for chunk in manifest['chunks']]
         else:
-            chunk_list = [f.replace('.json', '') for f in os.listdir(chunks_dir) 
-                         if f.endswith('.json')]
+            chunk_list = [name[:-5] for name in chunk_files]
         
         print(f"Processing {len(chunk_list)} chunks with configurable AI providers...")
         print(f"Available providers: {self.provider_manager.get_available_providers()}")
         
-        for chunk_id in chunk_list:
-            if isinstance(chunk_id, str):
-                chunk_file = os.path.join(chunks_dir, f"{chunk_id}.json")
-                
-                if os.path.exists(chunk_file):
-                    print(f"🔄 Converting chunk: {chunk_id}")
-                    
-                    # Load chunk content
-                    with open(chunk_file, 'r') as f:
-                        chunk_data = json.load(f)
-                    
-                    # Create conversion context
-                    context = EnhancedChunkContext(
-                        chunk_id=chunk_id,
-                        cpp_code=chunk_data.get('text', ''),
-                        chunk_type=self._infer_chunk_type(chunk_id),
-                        dependencies=[],
-                        comments=self._extract_comments(chunk_data.get('text', '')),
-                        function_signature=chunk_data.get('header'),
-                        tree_path=chunk_data.get('tree_path', f"root.{chunk_id}")
-                    )
-                    
-                    # Convert with AI
-                    success, kotlin_code = await self.convert_chunk_with_ai(context)
-                    
-                    # Save converted chunk
-                    output_file = os.path.join(output_dir, f"{chunk_id}.kt")
-                    with open(output_file, 'w') as f:
-                        f.write(kotlin_code)
-                    
-                    converted_chunks[chunk_id] = {
-                        "success": success,
-                        "output_file": output_file,
-                        "chunk_type": context.chunk_type,
-                        "original_code_lines": len(context.cpp_code.split('\n')),
-                        "converted_code_lines": len(kotlin_code.split('\n'))
-                    }
-                    
-                    if not success:
-                        self.conversion_stats["manual_review_flagged"] += 1
-                        print(f"⚠️ Chunk {chunk_id} needs manual review")
-                    else:
-                        print(f"✅ Chunk {chunk_id} converted successfully")
+        # Pin the conversion provider for the whole run instead of re-selecting per chunk
+        try:
+            self._conversion_target = self.provider_manager.get_optimal_provider_and_model(TaskType.CONVERSION)
+        except Exception:
+            self._conversion_target = None  # each request then reports the failure itself
+        
+        await asyncio.to_thread(self._load_cache)
+        
+        # Chunks convert concurrently; gather keeps results in manifest order
+        # Directory prefixes joined once; per-chunk paths are plain concatenation
+        results = await self._process_all(os.path.join(chunks_dir, ''), os.path.join(output_dir, ''),
+                                          chunk_list, set(chunk_files))
+        await asyncio.to_thread(self._save_cache)
+        converted_chunks = dict(results)
         
         self.conversion_stats["total_chunks"] = len(chunk_list)
         
         # Save conversion results
         results_file = os.path.join(output_dir, "enhanced_conversion_results.json")
-        with open(results_file, 'w') as f:
-            json.dump({
+        with open(results_file, 'wb') as f:
+            f.write(dump_json({
                 "converted_chunks": converted_chunks,
                 "stats": self.conversion_stats,
                 "provider_stats": self.provider_manager.get_stats()
-            }, f, indent=2)
+            }))
         
         self._print_conversion_summary()
     
+    async def _process_all(self, chunks_base: str, output_base: str, chunk_list: List,
+                           chunk_files: Set[str]) -> List[Tuple[str, Dict]]:
+        """Convert every listed chunk present in chunk_files, with at most max_concurrent AI calls in flight"""
+        sem = asyncio.Semaphore(self.max_concurrent)
+        
+        async def one(chunk_id: str) -> Tuple[str, Dict]:
+            async with sem:
+                return chunk_id, await self._process_chunk(chunks_base, output_base, chunk_id)
+        
+        return await asyncio.gather(*(one(chunk_id) for chunk_id in chunk_list
+                                      if isinstance(chunk_id, str) and f"{chunk_id}.json" in chunk_files))
+    
+    async def _process_chunk(self, chunks_base: str, output_base: str, chunk_id: str) -> Dict:
+        """Convert a single chunk file and return its result entry; the bases end in a path separator"""
+        chunk_file = chunks_base + chunk_id + '.json'
+        
+        logger.info("🔄 Converting chunk: %s", chunk_id)
+        
+        # Load chunk content (file I/O stays off the event loop)
+        chunk_data = await asyncio.to_thread(_load_chunk, chunk_file)
+        
+        # Create conversion context
+        context = EnhancedChunkContext(
+            chunk_id=chunk_id,
+            cpp_code=chunk_data.get('text', ''),
+            chunk_type=self._infer_chunk_type(chunk_id),
+            dependencies=[],
+            comments=self._extract_comments(chunk_data.get('text', '')),
+            function_signature=chunk_data.get('header'),
+            tree_path=chunk_data.get('tree_path', f"root.{chunk_id}")
+        )
+        
+        # Convert with AI
+        success, kotlin_code = await self.convert_chunk_with_ai(context)
+        
+        # Save converted chunk
+        output_file = output_base + chunk_id + '.kt'
+        await asyncio.to_thread(write_bytes, output_file, kotlin_code.encode('utf-8'))
+        
+        if not success:
+            self.conversion_stats["manual_review_flagged"] += 1
+            logger.warning("⚠️ Chunk %s needs manual review", chunk_id)
+        else:
+            logger.info("✅ Chunk %s converted successfully", chunk_id)
+        
+        return {
+            "success": success,
+            "output_file": output_file,
+            "chunk_type": context.chunk_type,
+            "original_code_lines": context.cpp_code.count('\n') + 1,
+            "converted_code_lines": kotlin_code.count('\n') + 1
+        }
+    
     def _infer_chunk_type(self, chunk_id: str) -> str:
         """Infer chunk type from chunk ID"""
         if 'function' in chunk_id:
@@ -249,13 +327,7 @@ Do not include explanations or markdown formatting.
     
     def _extract_comments(self, cpp_code: str) -> List[str]:
         """Extract comments from C++ code"""
-        comments = []
-        lines = cpp_code.split('\n')
-        for line in lines:
-            stripped = line.strip()
-            if stripped.startswith('//') or stripped.startswith('/*'):
-                comments.append(stripped)
-        return comments
+        return COMMENT_RE.findall(cpp_code)
     
     def _print_conversion_summary(self):
         """Print comprehensive conversion statistics"""
@@ -266,6 +338,8 @@ Do not include explanations or markdown formatting.
         print(f"Successful: {self.conversion_stats['successful_conversions']}")
         print(f"Failed: {self.conversion_stats['failed_conversions']}")
         print(f"Manual Review Needed: {self.conversion_stats['manual_review_flagged']}")
+        if self.cache_file is not None:
+            print(f"Cache Hits: {self.conversion_stats['cache_hits']}")
         print(f"Total Cost: ${self.conversion_stats['total_cost']:.3f}")
         
         if self.conversion_stats['total_chunks'] > 0:
@@ -291,15 +365,32 @@ async def main():
                        help="Force specific provider (mcp, openai, anthropic, ollama, lmstudio)")
     parser.add_argument("--model-override",
                        help="Force specific model for conversion")
+    parser.add_argument("--max-concurrent", type=int, default=int(os.getenv("AI_CONCURRENCY", "8")),
+                       help="Maximum number of chunks converted concurrently (default: $AI_CONCURRENCY or 8)")
+    parser.add_argument("--batch-size", type=int, default=1,
+                       help="Maximum chunks combined into one AI request (default: 1, no batching)")
+    parser.add_argument("--cache-file",
+                       help="Cache of conversions for unchanged chunks (default: <output-dir>/.conversion_cache.json)")
+    parser.add_argument("--no-cache", action="store_true",
+                       help="Convert every chunk, ignoring and not updating the cache")
+    parser.add_argument("--verbose", action="store_true",
+                       help="Log progress for every chunk")
     
     args = parser.parse_args()
+    # Own handler rather than basicConfig, so the provider manager's file log stays off the console
+    handler = logging.StreamHandler()
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO if args.verbose else logging.WARNING)
     
     print(f"🚀 Starting Enhanced AI-powered chunk conversion")
     print(f"📁 Input: {args.chunks_dir}")
     print(f"📁 Output: {args.output_dir}")
     print(f"⚙️ Config: {args.config}")
     
-    async with EnhancedAIChunkConverter(args.config) as converter:
+    cache_file = None if args.no_cache else (args.cache_file or os.path.join(args.output_dir, ".conversion_cache.json"))
+    
+    async with EnhancedAIChunkConverter(args.config, args.max_concurrent, args.batch_size, cache_file) as converter:
         # Apply overrides if specified
         if args.provider_override and args.model_override:
             for task_type in [TaskType.CONVERSION, TaskType.VALIDATION, TaskType.ASSEMBLY]:
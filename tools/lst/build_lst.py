@@ -3,9 +3,15 @@ import re
 import json
 import hashlib
 import argparse
+from bisect import bisect_right
 from dataclasses import dataclass, asdict
 from typing import List, Optional, Tuple
 
+try:
+    import orjson  # optional, serializes the dataclass tree natively and much faster
+except ImportError:
+    orjson = None
+
 # A very lightweight C++ structural slicer focused on this PoC file.
 # It is NOT a full parser. It produces a Lossless Semantic Tree (LST)
 # that preserves source slices and spans so we can reconstruct the file.
@@ -40,131 +46,166 @@ class LST:
 
 def compute_lines_index(src: str) -> List[int]:
     idx = [0]
-    for m in re.finditer(r"\n", src):
-        idx.append(m.end())
+    idx.extend(m.end() for m in NEWLINE_RE.finditer(src))
     return idx
 
 def byte_to_line(pos: int, line_index: List[int]) -> int:
-    # 1-based lines
-    lo, hi = 0, len(line_index)-1
-    while lo <= hi:
-        mid = (lo+hi)//2
-        if line_index[mid] <= pos:
-            lo = mid + 1
-        else:
-            hi = mid - 1
-    return hi + 1
+    # 1-based lines: number of line starts at or before pos
+    return bisect_right(line_index, pos)
 
 def make_span(start: int, end: int, line_index: List[int]) -> Span:
     return Span(start, end, byte_to_line(start, line_index), byte_to_line(end, line_index))
 
 # Heuristics for json_writer.cpp
-FUNC_RE = re.compile(r"(^|\n)\s*(?:static\s+)?(?:inline\s+)?(?:const\s+)?(?:Json::)?[A-Za-z_][\w:<>\s\*&]*\s+([A-Za-z_][\w:]*)\s*\(([^;{}]*)\)\s*(?:const\s*)?(?:->\s*[\w:<>]+\s*)?\{", re.M)
-NAMESPACE_RE = re.compile(r"(^|\n)\s*namespace\s+([A-Za-z_][\w:]*)\s*\{", re.M)
-CLASS_RE = re.compile(r"(^|\n)\s*(class|struct)\s+([A-Za-z_][\w:]*)[^;{]*\{", re.M)
-INCLUDE_RE = re.compile(r"(^|\n)\s*#\s*include\s+([^\n]+)")
-USING_RE = re.compile(r"(^|\n)\s*using\s+[\w:<>\s=,]+;", re.M)
+# Every construct starts at the beginning of the file or at a newline, followed by
+# whitespace; the patterns below match from its first token. LINE_START_RE finds
+# each such whitespace run once, so the file is scanned a single time, and its
+# lookahead captures the literal anchor (if any) the first token starts with.
+LINE_START_RE = re.compile(r"(?:\s*\n|\A)\s*(?=(#|namespace|class|struct|using)|\S)")
+FUNC_RE = re.compile(r"(?:static\s+)?(?:inline\s+)?(?:const\s+)?(?:Json::)?[A-Za-z_][\w:<>\*&]*(?:\s+[\w:<>\*&]+)*\s+([A-Za-z_][\w:]*)\s*\(([^;{}]*)\)\s*(?:const\s*)?(?:->\s*[\w:<>]+\s*)?\{")
+NAMESPACE_RE = re.compile(r"namespace\s+([A-Za-z_][\w:]*)\s*\{")
+CLASS_RE = re.compile(r"(class|struct)\s+([A-Za-z_][\w:]*)[^;{]*\{")
+INCLUDE_RE = re.compile(r"#\s*include\s+([^\n]+)")
+USING_RE = re.compile(r"using\s+[\w:<>\s=,]+;")
+NEWLINE_RE = re.compile(r"\n")
 
 # Brace matching to find body spans
 
+# Braces, literal openers and comment openers are the only places the scan stops
+BRACE_SCAN_RE = re.compile(r"[{}\"']|/[/*]")
+# Rest of a string/char literal after its opening quote, escapes included
+LITERAL_TAIL_RE = {
+    '"': re.compile(r'[^"\\]*(?:\\.[^"\\]*)*"', re.S),
+    '\'': re.compile(r"[^'\\]*(?:\\.[^'\\]*)*'", re.S),
+}
+
 def find_matching_brace(src: str, open_pos: int) -> Optional[int]:
     depth = 0
     i = open_pos
-    n = len(src)
-    while i < n:
+    while True:
+        m = BRACE_SCAN_RE.search(src, i)
+        if m is None:
+            return None
+        i = m.start()
         ch = src[i]
-        if ch == '"' or ch == '\'':
-            # skip string/char literals
-            q = ch
-            i += 1
-            while i < n:
-                if src[i] == '\\':
-                    i += 2
-                    continue
-                if src[i] == q:
-                    i += 1
-                    break
-                i += 1
-            continue
-        if ch == '/' and i+1 < n:
-            if src[i+1] == '/':
-                j = src.find('\n', i+2)
-                i = n if j == -1 else j+1
-                continue
-            if src[i+1] == '*':
-                j = src.find('*/', i+2)
-                i = n if j == -1 else j+2
-                continue
         if ch == '{':
             depth += 1
         elif ch == '}':
             depth -= 1
             if depth == 0:
                 return i
+        elif ch == '/':
+            if src[i+1] == '/':
+                j = src.find('\n', i+2)
+            else:
+                j = src.find('*/', i+2)
+                if j != -1:
+                    j += 1
+            if j == -1:
+                return None
+            i = j
+        else:
+            # skip string/char literals; an unterminated one runs to the end
+            lit = LITERAL_TAIL_RE[ch].match(src, i+1)
+            if lit is None:
+                return None
+            i = lit.end()
+            continue
         i += 1
-    return None
 
 
-def slice_node(src: str, m: re.Match, name_group: int, kind: str, line_index: List[int]) -> Node:
-    start = m.start() if m.start() == 0 else m.start()+1  # skip leading \n in group
-    header_end = src.find('{', m.end()-1)
+def slice_node(src: str, start: int, match_end: int, name: str, kind: str, line_index: List[int]) -> Node:
+    header_end = src.find('{', match_end-1)
     if header_end == -1:
-        header_end = m.end()
+        header_end = match_end
     body_start = header_end
     body_end = find_matching_brace(src, body_start)
     if body_end is None:
-        body_end = m.end()
+        body_end = match_end
     text = src[start:body_end+1]
-    name = m.group(name_group)
     span = make_span(start, body_end+1, line_index)
     header_span = make_span(start, header_end, line_index)
     body_span = make_span(body_start, body_end+1, line_index)
     return Node(kind, name, span, header_span, body_span, src[start:header_end], text, [])
 
 
+def _resume_start(src: str, prev_end: int, k: int) -> Optional[int]:
+    # The kind's previous match ended inside this whitespace run or beyond it
+    if prev_end >= k:
+        return None
+    q = src.find('\n', prev_end, k)
+    return None if q == -1 else q + 1
+
+
 def collect_toplevel(src: str, line_index: List[int]) -> List[Node]:
     nodes: List[Node] = []
-
-    # includes
-    for m in INCLUDE_RE.finditer(src):
-        s = m.start(0) if m.start(0) == 0 else m.start(0)+1
-        e = src.find('\n', m.end())
-        if e == -1: e = len(src)
-        nodes.append(Node('include', m.group(0).strip(), make_span(s, e, line_index), None, None, None, src[s:e], []))
-
-    # namespaces
-    for m in NAMESPACE_RE.finditer(src):
-        node = slice_node(src, m, 2, 'namespace', line_index)
-        nodes.append(node)
-
-    # classes/structs
-    for m in CLASS_RE.finditer(src):
-        node = slice_node(src, m, 3, 'class' if m.group(2) == 'class' else 'struct', line_index)
-        nodes.append(node)
-
-    # functions (toplevel and nested; we will nest later)
-    for m in FUNC_RE.finditer(src):
-        node = slice_node(src, m, 2, 'function', line_index)
-        nodes.append(node)
-
-    # using declarations
-    for m in USING_RE.finditer(src):
-        s = m.start(0) if m.start(0) == 0 else m.start(0)+1
-        e = m.end(0)
-        nodes.append(Node('using', None, make_span(s, e, line_index), None, None, None, src[s:e], []))
-
-    # macros (non-include)
-    for m in re.finditer(r"(^|\n)\s*#.*", src):
-        s = m.start(0) if m.start(0) == 0 else m.start(0)+1
-        e = src.find('\n', m.end())
-        if e == -1: e = len(src)
-        text = src[s:e]
-        if text.strip().startswith('#include'):
+    n = len(src)
+    # Where each kind's previous match ended; a kind never matches overlapping itself
+    inc_end = ns_end = cls_end = func_end = using_end = macro_end = 0
+
+    for run in LINE_START_RE.finditer(src):
+        a, k = run.span()
+        anchor = run.group(1)
+        # A node starts after the first newline of the run (or at 0 for the first line)
+        s0 = 0 if a == 0 else src.find('\n', a, k) + 1
+
+        if anchor == '#':
+            # includes
+            s = s0 if inc_end <= a else _resume_start(src, inc_end, k)
+            if s is not None:
+                m = INCLUDE_RE.match(src, k)
+                if m:
+                    inc_end = m.end()
+                    e = src.find('\n', inc_end)
+                    if e == -1: e = n
+                    nodes.append(Node('include', src[s-1 if s else 0:inc_end].strip(), make_span(s, e, line_index), None, None, None, src[s:e], []))
+
+            # macros (non-include); src[s:k] is whitespace, so the directive text starts at k
+            s = s0 if macro_end <= a else _resume_start(src, macro_end, k)
+            if s is not None:
+                e = src.find('\n', k)
+                if e == -1: e = n
+                macro_end = e
+                if not src.startswith('#include', k):
+                    nodes.append(Node('macro', None, make_span(s, e, line_index), None, None, None, src[s:e], []))
             continue
-        nodes.append(Node('macro', None, make_span(s, e, line_index), None, None, None, text, []))
 
-    # sort by start
-    nodes.sort(key=lambda n: n.span.start_byte)
+        # namespaces
+        if anchor == 'namespace':
+            s = s0 if ns_end <= a else _resume_start(src, ns_end, k)
+            if s is not None:
+                m = NAMESPACE_RE.match(src, k)
+                if m:
+                    ns_end = m.end()
+                    nodes.append(slice_node(src, s, ns_end, m.group(1), 'namespace', line_index))
+
+        # classes/structs
+        if anchor == 'class' or anchor == 'struct':
+            s = s0 if cls_end <= a else _resume_start(src, cls_end, k)
+            if s is not None:
+                m = CLASS_RE.match(src, k)
+                if m:
+                    cls_end = m.end()
+                    nodes.append(slice_node(src, s, cls_end, m.group(2), 'class' if m.group(1) == 'class' else 'struct', line_index))
+
+        # functions (toplevel and nested; we will nest later)
+        s = s0 if func_end <= a else _resume_start(src, func_end, k)
+        if s is not None:
+            m = FUNC_RE.match(src, k)
+            if m:
+                func_end = m.end()
+                nodes.append(slice_node(src, s, func_end, m.group(1), 'function', line_index))
+
+        # using declarations
+        if anchor == 'using':
+            s = s0 if using_end <= a else _resume_start(src, using_end, k)
+            if s is not None:
+                m = USING_RE.match(src, k)
+                if m:
+                    using_end = m.end()
+                    nodes.append(Node('using', None, make_span(s, using_end, line_index), None, None, None, src[s:using_end], []))
+
+    # Runs are visited in order, so nodes are already sorted by start
     return nodes
 
 
@@ -174,48 +215,50 @@ def nest_nodes(nodes: List[Node]) -> List[Node]:
         i for i, n in enumerate(nodes)
         if n.body_span is not None and n.kind in ('namespace', 'class', 'struct', 'function')
     ]
-    # Sort containers by body size ascending to find nearest ancestor first
-    idx_containers.sort(key=lambda i: (nodes[i].body_span.end_byte - nodes[i].body_span.start_byte))
+    # Sweep containers outer-before-inner (earlier node first on identical bodies, so it ends on top)
+    idx_containers.sort(key=lambda i: (nodes[i].body_span.start_byte, -nodes[i].body_span.end_byte, -i))
+    order = sorted(range(len(nodes)), key=lambda i: nodes[i].span.start_byte)
 
     parent_idx: List[Optional[int]] = [None] * len(nodes)
+    stack: List[int] = []
+    k = 0
 
-    for i, n in enumerate(nodes):
-        best: Optional[int] = None
+    for i in order:
+        n = nodes[i]
         ns, ne = n.span.start_byte, n.span.end_byte
-        for ci in idx_containers:
-            if ci == i:
-                continue
-            c = nodes[ci]
-            bs, be = c.body_span.start_byte, c.body_span.end_byte
-            if bs <= ns and ne <= be:
-                if best is None:
-                    best = ci
-                else:
-                    b = nodes[best]
-                    bbs, bbe = b.body_span.start_byte, b.body_span.end_byte
-                    if (bbe - bbs) > (be - bs):
-                        best = ci
+        # Containers closed before a position cannot enclose it or anything after it
+        while k < len(idx_containers) and nodes[idx_containers[k]].body_span.start_byte <= ns:
+            c = nodes[idx_containers[k]]
+            while stack and nodes[stack[-1]].body_span.end_byte < c.body_span.start_byte:
+                stack.pop()
+            stack.append(idx_containers[k])
+            k += 1
+        while stack and nodes[stack[-1]].body_span.end_byte < ns:
+            stack.pop()
+        # Every open container that could enclose the node is still on the stack; bodies
+        # can cross (keywords inside comments are matched), so take the smallest covering
+        # body rather than the innermost, lowest index first on equal sizes
+        best: Optional[int] = None
+        best_size = 0
+        for ci in stack:
+            b = nodes[ci].body_span
+            if ci != i and ne <= b.end_byte:
+                size = b.end_byte - b.start_byte
+                if best is None or size < best_size or (size == best_size and ci < best):
+                    best, best_size = ci, size
         parent_idx[i] = best
 
-    # assign children and filter roots
+    # assign children and filter roots; visiting nodes in start order keeps every
+    # children list (and the roots) sorted by start without sorting each one
     for n in nodes:
         n.children = []
-    for i, p in enumerate(parent_idx):
-        if p is not None:
+    roots: List[Node] = []
+    for i in order:
+        p = parent_idx[i]
+        if p is None:
+            roots.append(nodes[i])
+        else:
             nodes[p].children.append(nodes[i])
-
-    roots = [nodes[i] for i, p in enumerate(parent_idx) if p is None]
-
-    # For deterministic child order, sort children by start
-    def sort_rec(n: Node):
-        n.children.sort(key=lambda x: x.span.start_byte)
-        for ch in n.children:
-            sort_rec(ch)
-
-    for r in roots:
-        sort_rec(r)
-    # Sort roots by start
-    roots.sort(key=lambda x: x.span.start_byte)
     return roots
 
 
@@ -237,13 +280,19 @@ def add_gap_nodes(src: str, line_index: List[int], roots: List[Node]) -> List[No
 
 
 def build_lst_for_file(path: str) -> LST:
-    with open(path, 'r', encoding='utf-8') as f:
-        src = f.read()
+    with open(path, 'rb') as f:
+        raw = f.read()
+    src = raw.decode('utf-8')
+    if '\r' in src:
+        # Same universal-newline translation as reading in text mode
+        src = src.replace('\r\n', '\n').replace('\r', '\n')
+        raw = src.encode('utf-8')
     line_index = compute_lines_index(src)
     flat_nodes = collect_toplevel(src, line_index)
     roots = nest_nodes(flat_nodes)
     roots_with_gaps = add_gap_nodes(src, line_index, roots)
-    h = hashlib.sha256(src.encode('utf-8')).hexdigest()
+    # raw is the UTF-8 encoding of src, so it is hashed without re-encoding
+    h = hashlib.sha256(raw).hexdigest()
     return LST(version="0.1", file=path, source_hash=h, source_length=len(src), nodes=roots_with_gaps)
 
 
@@ -255,6 +304,12 @@ class EnhancedJSONEncoder(json.JSONEncoder):
         return super().default(o)
 
 
+def dump_lst(lst: LST) -> str:
+    if orjson is not None:
+        return orjson.dumps(lst, option=orjson.OPT_INDENT_2).decode('utf-8')
+    return json.dumps(lst, cls=EnhancedJSONEncoder, indent=2, ensure_ascii=False)
+
+
 def main():
     ap = argparse.ArgumentParser(description="Build Lossless Semantic Tree (PoC) for a C++ file")
     ap.add_argument('file', help='C++ source file')
@@ -262,7 +317,7 @@ def main():
     args = ap.parse_args()
 
     lst = build_lst_for_file(args.file)
-    out = json.dumps(lst, cls=EnhancedJSONEncoder, indent=2, ensure_ascii=False)
+    out = dump_lst(lst)
     if args.out:
         with open(args.out, 'w', encoding='utf-8') as f:
             f.write(out)
@@ -2,9 +2,11 @@
 import argparse
 import json
 import os
-import subprocess
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 
+from build_lst import build_lst_for_file, dump_lst
+
 ROOT = Path(__file__).resolve().parents[2]  # repo root
 THIS = Path(__file__).resolve().parent
 OUT_DIR = THIS / 'out'
@@ -30,8 +32,11 @@ def run_build(file_path: Path, out_dir: Path):
     rel = file_path.relative_to(ROOT)
     out_path = out_dir / (str(rel).replace('/', '__') + '.lst.json')
     out_path.parent.mkdir(parents=True, exist_ok=True)
-    cmd = ['python3', str(THIS / 'build_lst.py'), str(rel), '--out', str(out_path.relative_to(ROOT))]
-    subprocess.run(cmd, cwd=ROOT, check=True)
+    # Built in-process; the LST records the repo-relative path as the CLI did
+    lst = build_lst_for_file(str(file_path))
+    lst.file = str(rel)
+    with open(out_path, 'w', encoding='utf-8') as f:
+        f.write(dump_lst(lst))
     return out_path
 
 
@@ -39,6 +44,7 @@ def main():
     ap = argparse.ArgumentParser(description='Run LST generator across repo files')
     ap.add_argument('--root', default=str(ROOT), help='Repo root (default: repo)')
     ap.add_argument('--out', default=str(OUT_DIR), help='Output directory')
+    ap.add_argument('--jobs', '-j', type=int, default=os.cpu_count(), help='Worker processes (default: CPU count)')
     args = ap.parse_args()
 
     root = Path(args.root).resolve()
@@ -47,12 +53,14 @@ def main():
 
     files = find_source_files(root)
     stats = []
-    for f in files:
-        try:
-            outp = run_build(f, out_dir)
-            stats.append((f, outp))
-        except subprocess.CalledProcessError as e:
-            print(f"Failed: {f}: {e}")
+    with ProcessPoolExecutor(max_workers=args.jobs) as pool:
+        futures = [(f, pool.submit(run_build, f, out_dir)) for f in files]
+        for f, fut in futures:
+            try:
+                outp = fut.result()
+                stats.append((f, outp))
+            except Exception as e:
+                print(f"Failed: {f}: {e}")
     print(f"Generated {len(stats)} LST files under {out_dir}")
 
 if __name__ == '__main__':
@@ -0,0 +1,26 @@
+#!/usr/bin/env python3
+import unittest
+
+from build_lst import collect_toplevel, compute_lines_index, nest_nodes
+
+
+def tree(src: str):
+    def shape(n):
+        return (n.kind, n.name, [shape(c) for c in n.children])
+    return [shape(n) for n in nest_nodes(collect_toplevel(src, compute_lines_index(src)))]
+
+
+class NestNodesTest(unittest.TestCase):
+    def test_nested_bodies(self):
+        src = 'namespace N {\nclass C {\nint f() {\n}\n};\n}\n'
+        self.assertEqual(tree(src), [('namespace', 'N', [('class', 'C', [('function', 'f', [])])])])
+
+    def test_crossing_bodies_pick_smallest_cover(self):
+        # 'namespace N' is matched inside the comment, so its body crosses e's body;
+        # the using declaration belongs to e, the smaller body that covers it
+        src = 'void e() { /*\nnamespace N { { */\nusing t;\n}\nint z; int w; int q; int r;\n}\n'
+        self.assertEqual(tree(src), [('function', 'e', [('using', None, [])]), ('namespace', 'N', [])])
+
+
+if __name__ == '__main__':
+    unittest.main()
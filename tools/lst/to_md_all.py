@@ -1,8 +1,10 @@
 #!/usr/bin/env python3
 import argparse
 import os
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-import subprocess
+
+from to_md import generate_markdown
 
 THIS = Path(__file__).resolve().parent
 ROOT = THIS.parents[2]
@@ -20,18 +22,24 @@ def find_lst_json(root: Path):
     return sorted(paths)
 
 
+def convert(f: Path) -> Path:
+    md_path = f.with_suffix('').with_suffix('.md')
+    md_path.write_text(generate_markdown(f), encoding='utf-8')
+    return md_path
+
+
 def main():
     ap = argparse.ArgumentParser(description='Convert all LST JSONs to Markdown')
     ap.add_argument('--out', default=None, help='Ignored; Markdown goes next to each JSON')
+    ap.add_argument('--jobs', '-j', type=int, default=os.cpu_count(), help='Worker processes (default: CPU count)')
     args = ap.parse_args()
 
     files = find_lst_json(ROOT)
     count = 0
-    for f in files:
-        md_path = f.with_suffix('').with_suffix('.md')
-        cmd = ['python3', str(THIS / 'to_md.py'), str(f), '--out', str(md_path)]
-        subprocess.run(cmd, cwd=ROOT, check=True)
-        count += 1
+    with ProcessPoolExecutor(max_workers=args.jobs) as pool:
+        for md_path in pool.map(convert, files):
+            print(f"Wrote {md_path}")
+            count += 1
     print(f"Converted {count} LSTs to Markdown")
 
 if __name__ == '__main__':
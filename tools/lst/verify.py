@@ -4,20 +4,45 @@ import json
 from pathlib import Path
 
 
-def concat_text(nodes):
-    s = []
-    for n in nodes:
-        s.append(n['text'])
-    return ''.join(s)
+def iter_lst(lst_path: Path):
+    """Yield the LST's file path, then the text of each top-level node, streaming with ijson when available"""
+    try:
+        import ijson
+    except ImportError:
+        data = json.load(open(lst_path, 'r'))
+        yield data['file']
+        for n in data['nodes']:
+            yield n['text']
+        return
+    # Only top-level texts are materialized; nested children repeat them and are skipped
+    with open(lst_path, 'rb') as f:
+        yield next(ijson.items(f, 'file'))
+    with open(lst_path, 'rb') as f:
+        yield from ijson.items(f, 'nodes.item.text')
+
+
+def compare_text(src: str, texts):
+    """Match texts against src in order; return (first mismatch offset or None, rebuilt length)"""
+    pos = 0
+    mismatch = None
+    for t in texts:
+        if mismatch is None and not src.startswith(t, pos):
+            tail = src[pos:pos+len(t)]
+            mismatch = pos + next((i for i, (a, b) in enumerate(zip(tail, t)) if a != b), min(len(tail), len(t)))
+        pos += len(t)
+    if mismatch is None and pos != len(src):
+        mismatch = min(pos, len(src))
+    return mismatch, pos
 
 
 def verify(lst_path: Path, repo_root: Path):
-    data = json.load(open(lst_path, 'r'))
-    file_rel = data['file']
+    items = iter_lst(lst_path)
+    file_rel = next(items)
     src = (repo_root / file_rel).read_text(encoding='utf-8')
-    rebuilt = concat_text(data['nodes'])
-    ok = src == rebuilt
-    print(f"{lst_path}: {'OK' if ok else 'MISMATCH'}  len(src)={len(src)} len(rebuilt)={len(rebuilt)}")
+    mismatch, rebuilt_len = compare_text(src, items)
+    ok = mismatch is None
+    where = '' if ok else f" first_diff={mismatch}"
+    print(f"{lst_path}: {'OK' if ok else 'MISMATCH'}  len(src)={len(src)} len(rebuilt)={rebuilt_len}{where}")
     return ok
 
 
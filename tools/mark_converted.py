@@ -2,35 +2,46 @@
 """
 Mark all chunks as converted after successful systematic conversion
 """
-import json
 import sys
+from chunk_common import dump_json, loads, write_bytes_atomic
+
+_CONVERSION_NOTES = 'Converted via systematic tree traversal chunking'
 
 def mark_all_converted(tracking_file: str):
     """Mark all function chunks as converted"""
     
     # Load current tracking status
-    with open(tracking_file, 'r', encoding='utf-8') as f:
-        tracking_data = json.load(f)
+    with open(tracking_file, 'rb') as f:
+        tracking_data = loads(f.read())
     
-    # Mark all function chunks as converted
+    # Mark all function chunks as converted, noting whether anything actually changes
     converted_count = 0
-    for chunk_id, chunk_info in tracking_data['chunks'].items():
+    changed = False
+    for chunk_info in tracking_data['chunks'].values():
         if chunk_info['kind'] == 'function':
-            chunk_info['converted'] = True
-            chunk_info['in_final_kotlin'] = True
-            chunk_info['conversion_notes'] = 'Converted via systematic tree traversal chunking'
+            if (chunk_info.get('converted') is not True or chunk_info.get('in_final_kotlin') is not True
+                    or chunk_info.get('conversion_notes') != _CONVERSION_NOTES):
+                chunk_info['converted'] = True
+                chunk_info['in_final_kotlin'] = True
+                chunk_info['conversion_notes'] = _CONVERSION_NOTES
+                changed = True
             converted_count += 1
     
     # Update overall statistics
-    tracking_data['converted_count'] = converted_count
-    
-    # Save updated tracking
-    with open(tracking_file, 'w', encoding='utf-8') as f:
-        json.dump(tracking_data, f, indent=2, ensure_ascii=False)
+    if tracking_data.get('converted_count') != converted_count:
+        tracking_data['converted_count'] = converted_count
+        changed = True
     
     print(f"✅ Marked {converted_count} function chunks as converted")
+    if not changed:
+        print(f"✅ Tracking file already up to date: {tracking_file}")
+        return
+    
+    # Save updated tracking; written to a temp file first so a failed run never truncates it
+    write_bytes_atomic(tracking_file, dump_json(tracking_data))
+    
     print(f"✅ Updated tracking file: {tracking_file}")
 
 if __name__ == "__main__":
     tracking_file = sys.argv[1] if len(sys.argv) > 1 else "work/conversion_tracking.json"
-    mark_all_converted(tracking_file)
\ No newline at end of file
+    mark_all_converted(tracking_file)
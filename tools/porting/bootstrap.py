@@ -16,18 +16,24 @@ Mapping schema (JSON):
   "kotlin_bin": "tools/kotlin-json-writer/build/install/kotlin-json-writer/bin/kotlin-json-writer" # optional; will build if missing
 }
 """
-import argparse, json, os, subprocess, sys
+import argparse, json, os, shutil, subprocess, sys
 from pathlib import Path
 
-def run(cmd, cwd=None):
-    p = subprocess.run(cmd, cwd=cwd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+def run(cmd, cwd=None, env=None):
+    p = subprocess.run(cmd, cwd=cwd, env=env, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
     return p.returncode, p.stdout
 
 def ensure_cpp_harness(root: Path, accuracy: Path):
     cpp = accuracy / 'cpp_ref' / 'build' / 'cpp_ref'
     if cpp.exists():
         return cpp
-    rc, out = run([sys.executable, str(accuracy / 'setup_cpp_ref.py')], cwd=str(root))
+    # `cmake --build` honours CMAKE_BUILD_PARALLEL_LEVEL, so the harness build uses every core
+    env = dict(os.environ)
+    env.setdefault('CMAKE_BUILD_PARALLEL_LEVEL', str(os.cpu_count() or 1))
+    # CMake (3.17+) picks the launcher up from the environment; ccache makes rebuilds of unchanged TUs free
+    if shutil.which('ccache'):
+        env.setdefault('CMAKE_CXX_COMPILER_LAUNCHER', 'ccache')
+    rc, out = run([sys.executable, str(accuracy / 'setup_cpp_ref.py')], cwd=str(root), env=env)
     if rc != 0:
         print(out)
         sys.exit(1)
@@ -40,7 +46,7 @@ def ensure_kotlin_bin(root: Path, kotlin_module: Path):
     binpath = kotlin_module / 'build' / 'install' / kotlin_module.name / 'bin' / kotlin_module.name
     if binpath.exists():
         return binpath
-    rc, out = run(['gradle', '-q', 'installDist'], cwd=str(kotlin_module))
+    rc, out = run(['gradle', '-q', '--parallel', 'installDist'], cwd=str(kotlin_module))
     if rc != 0:
         print(out)
         sys.exit(1)
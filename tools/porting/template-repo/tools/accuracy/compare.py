@@ -1,13 +1,36 @@
 #!/usr/bin/env python3
-import argparse, json, subprocess
+import argparse, functools, hashlib, json, os, select, subprocess, threading, time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
-ROOT = Path(__file__).resolve().parents[3]
-DEF_CPP = ROOT / 'tools' / 'accuracy' / 'cpp_ref' / 'build' / 'cpp_ref'
-DEF_KT = ROOT / 'tools' / 'kotlin-json-writer' / 'build' / 'install' / 'kotlin-json-writer' / 'bin' / 'kotlin-json-writer'
 
+# Repo-relative defaults are resolved on demand: resolve() stats every ancestor,
+# which is wasted work when --cpp/--kt are given explicitly.
+@functools.cache
+def root() -> Path:
+    return Path(__file__).resolve().parents[3]
 
-def to_args(cfg):
+
+def default_cpp() -> Path:
+    return root() / 'tools' / 'accuracy' / 'cpp_ref' / 'build' / 'cpp_ref'
+
+
+def default_kt() -> Path:
+    kt = root() / 'tools' / 'kotlin-json-writer' / 'build'
+    # GraalVM native image (`gradle nativeCompile`); preferred when built since it skips JVM startup per case
+    native = kt / 'native' / 'nativeCompile' / 'kotlin-json-writer'
+    return native if native.exists() else kt / 'install' / 'kotlin-json-writer' / 'bin' / 'kotlin-json-writer'
+
+
+# Set COMPARE_NO_CACHE=1 to run every case even when an identical (cfg, json) pair was already run.
+NO_CACHE = os.environ.get('COMPARE_NO_CACHE') == '1'
+
+
+CFG_KEYS = ('indentation', 'precision', 'precisionType', 'emitUTF8', 'useSpecialFloats', 'enableYAMLCompatibility', 'dropNullPlaceholders')
+
+
+def to_args(cfg) -> tuple:
+    # Built directly: a handful of dict lookups is cheaper than any cache key for the cfg.
     indentation = cfg.get('indentation', '\t')
     precision = str(cfg.get('precision', 17))
     precisionType = cfg.get('precisionType', 'significant')
@@ -15,49 +38,256 @@ def to_args(cfg):
     useSpecialFloats = '1' if cfg.get('useSpecialFloats', False) else '0'
     enableYAMLCompatibility = '1' if cfg.get('enableYAMLCompatibility', False) else '0'
     dropNullPlaceholders = '1' if cfg.get('dropNullPlaceholders', False) else '0'
-    return [indentation, precision, precisionType, emitUTF8, useSpecialFloats, enableYAMLCompatibility, dropNullPlaceholders]
+    return (indentation, precision, precisionType, emitUTF8, useSpecialFloats, enableYAMLCompatibility, dropNullPlaceholders)
+
+
+def spawn_capture(args: list, input_bytes: bytes):
+    # close_fds=False lets CPython launch via posix_spawn (vfork-style, no page-table
+    # copy) instead of fork+exec. Safe: Python creates its fds non-inheritable.
+    p = subprocess.run(args, input=input_bytes, capture_output=True, close_fds=False)
+    return p.returncode, p.stdout, p.stderr
+
+
+def run(binpath: Path, doc_bytes: bytes, cfg_args: tuple):
+    return spawn_capture([str(binpath), *cfg_args], doc_bytes)
+
+
+# Batch protocol (`<bin> --batch`): the binary announces itself with a
+# `BATCH 1` line, then loops over framed records on stdin until EOF. Each record is
+#   <cfg_len>\n<cfg_json><doc_len>\n<doc_bytes>
+# and each reply is
+#   <rc>\n<out_len>\n<out_bytes>
+# where out_bytes carries the error message when rc != 0.
+BATCH_HELLO = b'BATCH 1'
+
+
+class BatchUnsupported(Exception):
+    pass
+
+
+def wait_fd(fd: int, deadline: float, write: bool = False):
+    remaining = deadline - time.monotonic()
+    ready = select.select([], [fd], [], max(0, remaining)) if write else select.select([fd], [], [], max(0, remaining))
+    if not any(ready):
+        raise TimeoutError('batch worker did not answer in time')
+
+
+def start_worker(binpath: Path, timeout: float):
+    proc = subprocess.Popen([str(binpath), '--batch'], stdin=subprocess.PIPE, stdout=subprocess.PIPE, bufsize=0, close_fds=False)
+    # Writes go through select() too, so a worker that stops reading cannot block us.
+    os.set_blocking(proc.stdin.fileno(), False)
+    try:
+        hello = read_line(proc.stdout.fileno(), time.monotonic() + timeout)
+    except (EOFError, TimeoutError):
+        hello = None
+    if hello != BATCH_HELLO:
+        proc.kill()
+        proc.wait()
+        raise BatchUnsupported(f"{binpath} does not support --batch (no '{BATCH_HELLO.decode()}' line on startup)")
+    return proc
+
+
+def write_all(fd: int, data: bytes, deadline: float):
+    view = memoryview(data)
+    while view:
+        wait_fd(fd, deadline, write=True)
+        view = view[os.write(fd, view):]
+
+
+def read_exactly(fd: int, n: int, deadline: float) -> bytes:
+    buf = bytearray()
+    while len(buf) < n:
+        wait_fd(fd, deadline)
+        chunk = os.read(fd, n - len(buf))
+        if not chunk:
+            raise EOFError('batch worker closed its output')
+        buf += chunk
+    return bytes(buf)
+
 
+def read_line(fd: int, deadline: float) -> bytes:
+    buf = bytearray()
+    while True:
+        wait_fd(fd, deadline)
+        c = os.read(fd, 1)
+        if not c:
+            raise EOFError('batch worker closed its output')
+        if c == b'\n':
+            return bytes(buf)
+        buf += c
 
-def run(binpath: Path, json_str: str, cfg: dict):
-    args = [str(binpath)] + to_args(cfg)
-    p = subprocess.run(args, input=json_str.encode('utf-8'), stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-    return p.returncode, p.stdout.decode('utf-8'), p.stderr.decode('utf-8')
+
+@functools.lru_cache(maxsize=256)
+def cfg_record(cfg_args: tuple) -> bytes:
+    return dump_json(dict(zip(CFG_KEYS, cfg_args)))
+
+
+def send_case(proc, doc_bytes: bytes, cfg_args: tuple, timeout: float):
+    # One deadline per case covers sending the record and reading the whole reply.
+    deadline = time.monotonic() + timeout
+    cfg_bytes = cfg_record(cfg_args)
+    write_all(proc.stdin.fileno(), b'%d\n%s%d\n%s' % (len(cfg_bytes), cfg_bytes, len(doc_bytes), doc_bytes), deadline)
+    fd = proc.stdout.fileno()
+    rc = int(read_line(fd, deadline))
+    out = read_exactly(fd, int(read_line(fd, deadline)), deadline)
+    return (rc, out, b'') if rc == 0 else (rc, b'', out)
+
+
+def stop_worker(proc, timeout: float):
+    proc.stdin.close()
+    try:
+        proc.wait(timeout)
+    except subprocess.TimeoutExpired:
+        proc.kill()
+        proc.wait()
+
+
+def case_key(doc_bytes: bytes, cfg_args: tuple) -> bytes:
+    # to_args() fills in defaults, so an empty cfg and an explicit default cfg share a key.
+    h = hashlib.blake2b(doc_bytes, digest_size=16)
+    h.update(b'\0' + '\0'.join(cfg_args).encode('utf-8'))
+    return h.digest()
+
+
+def memoize(runner):
+    cache = {}
+
+    def call(doc_bytes: bytes, cfg_args: tuple):
+        key = case_key(doc_bytes, cfg_args)
+        hit = cache.get(key)
+        if hit is None:
+            hit = cache[key] = runner(doc_bytes, cfg_args)
+        return hit
+
+    return runner if NO_CACHE else call
+
+
+@functools.cache
+def _orjson():
+    # Optional faster JSON codec, imported on first use rather than at startup.
+    try:
+        import orjson
+    except ImportError:
+        return None
+    return orjson
+
+
+def load_json(path: str):
+    orjson = _orjson()
+    if orjson is not None:
+        return orjson.loads(Path(path).read_bytes())
+    return json.load(open(path, 'r'))
+
+
+def dump_json(obj) -> bytes:
+    orjson = _orjson()
+    return orjson.dumps(obj) if orjson is not None else json.dumps(obj).encode('utf-8')
+
+
+def text(data: bytes) -> str:
+    return data.decode('utf-8', errors='replace')
+
+
+def run_case(case, run_cpp, run_kt):
+    # Outputs stay raw bytes: compared directly, and only decoded when a report needs them.
+    name = case['name']
+    obj = case['json']
+    # Serialized and encoded once; every runner receives the same bytes.
+    doc_bytes = dump_json(obj)
+    cfg_args = to_args(case.get('cfg', {}))
+    rc_cpp, out_cpp, err_cpp = run_cpp(doc_bytes, cfg_args)
+    if rc_cpp != 0:
+        return False, f"[cpp] FAIL {name}: {text(err_cpp).strip()}"
+    rc_k, out_k, err_k = run_kt(doc_bytes, cfg_args)
+    if rc_k != 0:
+        return False, f"[kt ] FAIL {name}: {text(err_k).strip()}"
+    if out_cpp != out_k:
+        return False, f"[diff] {name}: outputs differ\n--cpp--\n{text(out_cpp)}\n--kt --\n{text(out_k)}"
+    return True, f"[ok ] {name}"
 
 
 def main():
     ap = argparse.ArgumentParser()
     ap.add_argument('--cases', required=True)
-    ap.add_argument('--cpp', default=str(DEF_CPP))
-    ap.add_argument('--kt', default=str(DEF_KT))
+    ap.add_argument('--cpp', help='C++ reference binary (default: tools/accuracy/cpp_ref/build/cpp_ref)')
+    ap.add_argument('--kt', help='Kotlin CLI (default: native image if built, else the installDist launcher)')
+    ap.add_argument('--batch', action='store_true', help='keep one --batch process per binary instead of one process per case')
+    ap.add_argument('--timeout', type=float, default=60, help='seconds a --batch worker may take to start or to answer one case (default: 60)')
+    ap.add_argument('--jobs', type=int, default=os.cpu_count() or 1, help='cases run concurrently (one worker pair per job in --batch mode)')
     args = ap.parse_args()
-    cpp = Path(args.cpp)
-    kt = Path(args.kt)
+    cpp = Path(args.cpp) if args.cpp else default_cpp()
+    kt = Path(args.kt) if args.kt else default_kt()
+
+    workers = []
+    lock = threading.Lock()
+    aborted = threading.Event()
+    if args.batch:
+        local = threading.local()
+
+        def start_pair():
+            cpp_proc = start_worker(cpp, args.timeout)
+            try:
+                return cpp_proc, start_worker(kt, args.timeout)
+            except BaseException:
+                cpp_proc.kill()
+                cpp_proc.wait()
+                raise
+
+        # Started up front so an unsupported binary is refused before any case runs;
+        # the first thread to need a pair takes this one.
+        try:
+            idle = [start_pair()]
+        except BatchUnsupported as e:
+            raise SystemExit(f"--batch: {e}")
+        workers.extend(idle)
+
+        def pair():
+            if not hasattr(local, 'pair'):
+                with lock:
+                    p = idle.pop() if idle else None
+                if p is None:
+                    p = start_pair()
+                    with lock:
+                        workers.append(p)
+                        if aborted.is_set():
+                            for proc in p:
+                                proc.kill()
+                            raise RuntimeError('comparison aborted')
+                local.pair = p
+            return local.pair
+
+        run_cpp = lambda doc_bytes, cfg_args: send_case(pair()[0], doc_bytes, cfg_args, args.timeout)
+        run_kt = lambda doc_bytes, cfg_args: send_case(pair()[1], doc_bytes, cfg_args, args.timeout)
+    else:
+        run_cpp = lambda doc_bytes, cfg_args: run(cpp, doc_bytes, cfg_args)
+        run_kt = lambda doc_bytes, cfg_args: run(kt, doc_bytes, cfg_args)
+    run_cpp = memoize(run_cpp)
+    run_kt = memoize(run_kt)
 
-    cases = json.load(open(args.cases, 'r'))
+    cases = load_json(args.cases)
     failures = 0
-    for case in cases:
-        name = case['name']
-        obj = case['json']
-        json_str = json.dumps(obj)
-        cfg = case.get('cfg', {})
-        rc_cpp, out_cpp, err_cpp = run(cpp, json_str, cfg)
-        if rc_cpp != 0:
-            print(f"[cpp] FAIL {name}: {err_cpp.strip()}")
-            failures += 1
-            continue
-        rc_k, out_k, err_k = run(kt, json_str, cfg)
-        if rc_k != 0:
-            print(f"[kt ] FAIL {name}: {err_k.strip()}")
-            failures += 1
-            continue
-        if out_cpp != out_k:
-            print(f"[diff] {name}: outputs differ")
-            print("--cpp--\n" + out_cpp)
-            print("--kt --\n" + out_k)
-            failures += 1
-        else:
-            print(f"[ok ] {name}")
+    ex = ThreadPoolExecutor(max_workers=max(1, args.jobs))
+    try:
+        # map() yields in submission order, so the report stays deterministic.
+        for ok, report in ex.map(lambda case: run_case(case, run_cpp, run_kt), cases):
+            print(report)
+            if not ok:
+                failures += 1
+    except BaseException:
+        # Kill every worker on any error (timeout, dead worker, Ctrl-C) so none is left
+        # running; threads still blocked on a killed worker then fail fast with EOFError.
+        ex.shutdown(wait=False, cancel_futures=True)
+        with lock:
+            aborted.set()
+            for procs in workers:
+                for proc in procs:
+                    proc.kill()
+        raise
+    ex.shutdown()
 
+    for procs in workers:
+        for proc in procs:
+            stop_worker(proc, args.timeout)
     raise SystemExit(1 if failures else 0)
 
 if __name__ == '__main__':
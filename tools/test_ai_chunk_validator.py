@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+import asyncio
+import json
+import unittest
+
+from ai_chunk_validator import AIChunkValidator, ValidationCriteria, _mock_event_stream
+
+
+async def sse(deltas, done=True):
+    for d in deltas:
+        yield b"data: " + json.dumps(d).encode() + b"\n"
+    if done:
+        yield b"data: [DONE]\n"
+
+
+class EventStreamTest(unittest.TestCase):
+    def read(self, lines):
+        return asyncio.run(AIChunkValidator()._read_event_stream(lines))
+
+    def test_deltas_are_joined_in_order(self):
+        reply = json.dumps({"is_valid": True, "issues": ["a } b", "] c"], "nested": {"x": [1, {"y": 2}]}})
+        # Cut after every '}' and ']' too, where an eager parser would try to decode
+        deltas = [reply[i:i + 3] for i in range(0, len(reply), 3)]
+        self.assertEqual(self.read(sse(deltas)), reply)
+
+    def test_stream_without_done_ends_at_eof(self):
+        self.assertEqual(self.read(sse(['{"score": ', '0.5}'], done=False)), '{"score": 0.5}')
+
+    def test_non_data_lines_are_skipped(self):
+        async def lines():
+            yield b": keep-alive\n"
+            yield b"event: delta\n"
+            yield b'data: "{}"\n'
+            yield b"data: [DONE]\n"
+            yield b'data: "ignored"\n'
+        self.assertEqual(self.read(lines()), "{}")
+
+    def test_mock_stream_round_trips(self):
+        text = json.dumps({"issues": ["日本語のコメント"] * 40})
+        self.assertEqual(self.read(_mock_event_stream(text, delta_size=7)), text)
+
+    def test_validate_batch_through_stream(self):
+        pairs = [("c1", "int a;", "val a = 0"), ("c2", "int b;", "val b = 0")]
+        results = asyncio.run(AIChunkValidator().validate_batch(pairs, ValidationCriteria()))
+        self.assertEqual([r.chunk_id for r in results], ["c1", "c2"])
+        self.assertTrue(all(r.is_valid and r.score == 0.85 for r in results))
+
+
+if __name__ == '__main__':
+    unittest.main()